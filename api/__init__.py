@@ -0,0 +1,280 @@
+"""Local HTTP API over the latest values and recorded history"""
+
+import asyncio
+import csv
+import io
+import itertools
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+import httpx
+
+from store import MetricStore, Rollup
+
+from .http import HttpError, Request, ResponseAbortedError, read_request, send, send_stream
+from .metrics import CONTENT_TYPE, MetricsExporter
+from .snapshot import Snapshot
+
+if TYPE_CHECKING:
+    from pvs.pvs_detail import PVSDetail
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the store per executor call while streaming history
+PAGE_SIZE = 1000
+
+# Range returned by /history when no start is given, in seconds
+DEFAULT_RANGE = 86400
+
+POINT_COLUMNS = ("ts", "value", "text")
+ROLLUP_COLUMNS = ("ts", "count", "mean", "min", "max", "last", "delta")
+
+FORMATS = {"json": "application/json", "csv": "text/csv"}
+
+__all__ = ["ApiServer", "MetricsExporter", "Snapshot"]
+
+
+def downsample(rows: Iterable[Rollup], origin: int, step: int) -> Iterator[Rollup]:
+    """Merge rollup rows in time order into buckets of step milliseconds from origin
+
+    Rows starting before origin, like a rollup bucket overlapping it, go into the first bucket.
+    """
+    for start, group in itertools.groupby(
+        rows,
+        key=lambda row: origin + max(0, row[0] - origin) // step * step,
+    ):
+        count = total = 0
+        minimum, maximum, last, delta = float("inf"), float("-inf"), None, None
+
+        for _ts, row_count, mean, row_min, row_max, row_last, row_delta in group:
+            count += row_count
+            total += mean * row_count
+            minimum = min(minimum, row_min)
+            maximum = max(maximum, row_max)
+            last = row_last
+            if row_delta is not None:
+                delta = (delta or 0.0) + row_delta
+
+        yield start, count, total / count, minimum, maximum, last, delta
+
+
+def _as_rollups(points: Iterable[tuple[int, float | None, str | None]]) -> Iterator[Rollup]:
+    """Turn numeric raw points into single sample rollup rows, dropping text samples"""
+    for ts, value, _text in points:
+        if value is not None:
+            yield ts, 1, value, value, value, value, None
+
+
+def _parse_time(value: str | None, default: float) -> int:
+    """Parse an epoch seconds query parameter into milliseconds"""
+    try:
+        return int((default if value is None else float(value)) * 1000)
+    except ValueError:
+        msg = f"Invalid time {value}"
+        raise HttpError(HTTPStatus.BAD_REQUEST, msg) from None
+
+
+class ApiServer:
+    """Serves the latest snapshot, Prometheus metrics and history range queries over HTTP
+
+    GET /snapshot returns the latest values of the PVS and every ESS device and GET /metrics
+    exports them for Prometheus, labelled with the devices and enum states. GET /series lists
+    the recorded series and GET /history?series=<name>&start=<s>&end=<s>&points=<n>&format=
+    <json|csv> streams a series, merged into about points buckets read from the coarsest
+    rollup tier that still has enough of them, or every raw sample when points is not given.
+    GET /devicelist returns the cached PVS DeviceList, so other tools need not query the PVS.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str,
+        port: int,
+        store: MetricStore | None = None,
+        *,
+        devices: dict[str, dict[str, str]] | None = None,
+        enums: dict[str, dict[str, tuple[str, ...]]] | None = None,
+        device_list: "PVSDetail | None" = None,
+    ) -> None:
+        """Initialize the server, it listens once run is called
+
+        devices maps ESS device names to their metric labels and enums their fields' states.
+        device_list caches the PVS DeviceList served by /devicelist.
+        """
+        self.host = host
+        self.port = port
+        self.store = store
+        self.device_list = device_list
+        self.snapshot = Snapshot()
+        self.metrics = MetricsExporter(devices, enums)
+        self.server: asyncio.Server | None = None
+        self._stopped = asyncio.Event()
+        self.routes = {
+            "/snapshot": self._snapshot,
+            "/metrics": self._metrics,
+            "/series": self._series,
+            "/history": self._history,
+            "/devicelist": self._device_list,
+        }
+
+    def update(self, source: str, values: dict, timestamp: float) -> None:
+        """Set the latest values of a source, the PVS power topic or an ESS device"""
+        self.snapshot.update(source, values, timestamp)
+        self.metrics.update(source, values)
+
+    async def run(self) -> None:
+        """Serve requests until stopped"""
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        msg = f"API listening on {self.host}:{self.port}"
+        logger.info(msg)
+
+        await self._stopped.wait()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def stop(self) -> None:
+        """Stop serving requests"""
+        self._stopped.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer a single request and close the connection"""
+        try:
+            request = await read_request(reader)
+            if request is not None:
+                await self._dispatch(request, writer)
+        except ResponseAbortedError:
+            # Closing the connection before the last chunk tells the client the body is incomplete
+            logger.exception("API response failed while streaming")
+        except HttpError as e:
+            body = json.dumps({"error": e.message}).encode()
+            await send(writer, e.status, body)
+        except (TimeoutError, ConnectionError):
+            pass
+        except Exception:
+            logger.exception("API request failed")
+            await send(writer, HTTPStatus.INTERNAL_SERVER_ERROR, b'{"error":"Internal error"}')
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        """Route a request to its handler"""
+        handler = self.routes.get(request.path)
+        if handler is None:
+            raise HttpError(HTTPStatus.NOT_FOUND)
+        if request.method != "GET":
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        msg = f"API {request.method} {request.path} {request.query}"
+        logger.debug(msg)
+        await handler(request, writer)
+
+    async def _snapshot(self, _request: Request, writer: asyncio.StreamWriter) -> None:
+        """Send the latest values"""
+        await send(writer, HTTPStatus.OK, self.snapshot.render())
+
+    async def _metrics(self, _request: Request, writer: asyncio.StreamWriter) -> None:
+        """Send the latest values in the Prometheus text format"""
+        await send(writer, HTTPStatus.OK, self.metrics.render(), CONTENT_TYPE)
+
+    async def _device_list(self, _request: Request, writer: asyncio.StreamWriter) -> None:
+        """Send the cached PVS DeviceList with its age in seconds"""
+        if self.device_list is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "The PVS DeviceList is not cached")
+
+        try:
+            content = await self.device_list.get_device_list()
+        except (httpx.HTTPError, ValueError) as e:
+            msg = f"Could not get the PVS DeviceList: {e}"
+            raise HttpError(HTTPStatus.BAD_GATEWAY, msg) from None
+
+        headers = {"Age": str(max(0, int(self.device_list.age)))}
+        await send(writer, HTTPStatus.OK, content, headers=headers)
+
+    def _require_store(self) -> MetricStore:
+        """Return the store, answering 404 when recording is disabled"""
+        if self.store is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "No metric store is configured")
+        return self.store
+
+    async def _series(self, _request: Request, writer: asyncio.StreamWriter) -> None:
+        """Send the names of the recorded series"""
+        store = self._require_store()
+        # The writer thread adds series, so the names are read there
+        names = await store.execute(sorted, store.series)
+        await send(writer, HTTPStatus.OK, json.dumps(names).encode())
+
+    async def _history(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        """Stream a range of a series as JSON or CSV"""
+        store = self._require_store()
+        query = request.query
+
+        name = query.get("series")
+        if name is None:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Missing series")
+
+        output = query.get("format", "json")
+        if output not in FORMATS:
+            msg = f"Unknown format {output}, expected one of {tuple(FORMATS)}"
+            raise HttpError(HTTPStatus.BAD_REQUEST, msg)
+
+        now = time.time()
+        end = _parse_time(query.get("end"), now)
+        start = _parse_time(query.get("start"), end / 1000 - DEFAULT_RANGE)
+
+        try:
+            points = int(query.get("points", 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid points") from None
+        if start >= end or points < 0:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Empty range")
+
+        tier = None
+        if not points:
+            rows = store.iter_points(name, start, end)
+        else:
+            step = -(-(end - start) // points)
+            tier = store.select_tier(start, end, points)
+            if tier is None:
+                rows = downsample(_as_rollups(store.iter_points(name, start, end)), start, step)
+            else:
+                # Include the rollup bucket that starts before start but overlaps it
+                first = start // (tier * 1000) * tier * 1000
+                rows = downsample(store.iter_rollups(name, tier, first, end), start, step)
+        columns = ROLLUP_COLUMNS if points else POINT_COLUMNS
+
+        header = {"series": name, "tier": tier, "start": start, "end": end, "columns": columns}
+        await send_stream(
+            writer,
+            self._render(store, rows, output, header),
+            FORMATS[output],
+        )
+
+    async def _render(
+        self,
+        store: MetricStore,
+        rows: Iterator[tuple],
+        output: str,
+        header: dict,
+    ) -> AsyncIterator[bytes]:
+        """Render rows page by page, reading each page on the store's writer thread"""
+        if output == "csv":
+            yield (",".join(header["columns"]) + "\n").encode()
+        else:
+            yield json.dumps(header, separators=(",", ":"))[:-1].encode() + b',"rows":['
+
+        first = True
+        while page := await store.execute(lambda: list(itertools.islice(rows, PAGE_SIZE))):
+            if output == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer, lineterminator="\n").writerows(page)
+                yield buffer.getvalue().encode()
+            else:
+                body = json.dumps(page, separators=(",", ":"))[1:-1].encode()
+                yield body if first else b"," + body
+                first = False
+
+        if output == "json":
+            yield b"]}"
@@ -0,0 +1,103 @@
+"""Minimal HTTP/1.1 request parsing and response writing on asyncio streams"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from http import HTTPStatus
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+# Limits on what a client may send, the API only takes short GET requests
+MAX_HEADERS = 100
+REQUEST_TIMEOUT = 10
+
+
+class HttpError(Exception):
+    """An error answered with an HTTP status"""
+
+    def __init__(self, status: HTTPStatus, message: str | None = None) -> None:
+        """Initialize the error with a status and an optional message"""
+        super().__init__(message or status.phrase)
+        self.status = status
+        self.message = message or status.phrase
+
+
+class ResponseAbortedError(Exception):
+    """A response that failed after its status line and headers were sent"""
+
+
+class Request(NamedTuple):
+    """A parsed request line, the body is never read"""
+
+    method: str
+    path: str
+    query: dict[str, str]
+
+
+async def read_request(reader: asyncio.StreamReader) -> Request | None:
+    """Read a request line and skip its headers, None if the client closed the connection"""
+    async with asyncio.timeout(REQUEST_TIMEOUT):
+        line = await reader.readline()
+        if not line:
+            return None
+
+        for _ in range(MAX_HEADERS):
+            if (await reader.readline()).strip() in (b"", b"\r\n"):
+                break
+        else:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST) from None
+
+    url = urlsplit(target)
+    query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    return Request(method, url.path, query)
+
+
+def _head(status: HTTPStatus, content_type: str, headers: dict[str, str]) -> bytes:
+    """Return the status line and headers of a response"""
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    lines.append("Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send(
+    writer: asyncio.StreamWriter,
+    status: HTTPStatus,
+    body: bytes,
+    content_type: str = "application/json",
+    headers: dict[str, str] | None = None,
+) -> None:
+    """Write a complete response, with extra headers when given"""
+    headers = {**(headers or {}), "Content-Length": str(len(body))}
+    writer.write(_head(status, content_type, headers) + body)
+    await writer.drain()
+
+
+async def send_stream(
+    writer: asyncio.StreamWriter,
+    parts: AsyncIterator[bytes],
+    content_type: str,
+) -> None:
+    """Write a chunked response, waiting for the client to keep up between parts
+
+    Errors raised by parts are raised as ResponseAbortedError, as no other status can be sent.
+    """
+    writer.write(_head(HTTPStatus.OK, content_type, {"Transfer-Encoding": "chunked"}))
+
+    try:
+        async for part in parts:
+            if part:
+                writer.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+                await writer.drain()
+    except ConnectionError:
+        raise
+    except Exception as e:
+        msg = "Streamed response failed"
+        raise ResponseAbortedError(msg) from e
+
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
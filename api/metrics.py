@@ -0,0 +1,171 @@
+"""Prometheus text exposition of the latest recorded values"""
+
+import math
+import re
+from typing import Any
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prefix of every exported metric
+NAMESPACE = "pvs"
+
+# Metric name of ESS device fields, the PVS and other sources use their own name
+ESS_SUBSYSTEM = "ess"
+
+# Label naming the second part of <kind>/<name> sources, serial unless listed here
+KIND_LABELS = {"fleet": "column"}
+
+INVALID_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def metric_name(*parts: str) -> str:
+    """Join parts into a valid metric name"""
+    return INVALID_NAME.sub("_", "_".join(parts))
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    """Render labels as name="value" pairs, escaped as the exposition format requires"""
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+
+
+def format_value(value: float) -> str:
+    """Render a sample value"""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Family:
+    """The samples of one metric, rendered into a block that is cached until they change"""
+
+    __slots__ = ("block", "name", "samples")
+
+    def __init__(self, name: str) -> None:
+        """Initialize an empty gauge family"""
+        self.name = name
+        self.samples: dict[str, tuple[tuple[str, ...] | None, Any]] = {}
+        self.block: bytes | None = None
+
+    def set(
+        self,
+        labels: str,
+        value: Any,  # noqa: ANN401
+        states: tuple[str, ...] | None = None,
+    ) -> None:
+        """Set the value of the series with the rendered labels, a state set if states are given"""
+        self.samples[labels] = (states, value)
+        self.block = None
+
+    def render(self) -> bytes:
+        """Return the TYPE line and samples of the family"""
+        if self.block is None:
+            lines = [f"# TYPE {self.name} gauge"]
+            for labels, (states, value) in self.samples.items():
+                lines.extend(self._lines(labels, value, states))
+            self.block = ("\n".join(lines) + "\n").encode() if len(lines) > 1 else b""
+
+        return self.block
+
+    def _lines(
+        self,
+        labels: str,
+        value: Any,  # noqa: ANN401
+        states: tuple[str, ...] | None,
+    ) -> list[str]:
+        """Render the samples of a single series"""
+        separator = "," if labels else ""
+
+        if states is not None:
+            # One sample per state, 1 for the current one, as OpenMetrics state sets do
+            return [
+                f'{self.name}{{{labels}{separator}{self.name}="{state}"}} {int(value == state)}'
+                for state in states
+            ]
+
+        if isinstance(value, dict):
+            return [
+                f'{self.name}{{{labels}{separator}flag="{flag}"}} {int(bool(state))}'
+                for flag, state in value.items()
+            ]
+
+        if isinstance(value, bool | int | float):
+            series = f"{self.name}{{{labels}}}" if labels else self.name
+            return [f"{series} {format_value(value)}"]
+
+        # Free text like serial numbers has no numeric representation
+        return []
+
+
+class MetricsExporter:
+    """Last-value table of every source rendered in the Prometheus text format
+
+    ESS device fields are exported as pvs_ess_<field> with device, type and unit_id labels,
+    enum fields as state sets. Sources named <kind>/<serial>, like solar panels, are exported
+    as pvs_<kind>_<key> with a serial label, or the label in KIND_LABELS, and other sources,
+    like the PVS power topic, as pvs_<source>_<key>. The metric and label text of each series
+    is built once, and only the families that changed since the last scrape are rendered again.
+    """
+
+    def __init__(
+        self,
+        devices: dict[str, dict[str, str]] | None = None,
+        enums: dict[str, dict[str, tuple[str, ...]]] | None = None,
+    ) -> None:
+        """Initialize the exporter with the labels and enum states of each ESS device"""
+        self.devices = devices or {}
+        self.enums = enums or {}
+        self.families: dict[str, Family] = {}
+        self.series: dict[tuple[str, str], tuple[Family, str, tuple[str, ...] | None]] = {}
+        self._rendered: bytes | None = None
+
+    def update(self, source: str, values: dict[str, Any]) -> None:
+        """Set the latest values of a source"""
+        for key, value in values.items():
+            entry = self.series.get((source, key))
+            if entry is None:
+                entry = self.series[(source, key)] = self._add_series(source, key)
+
+            family, labels, states = entry
+            family.set(labels, value, states)
+
+        self._rendered = None
+
+    def render(self) -> bytes:
+        """Return the exposition text of every family"""
+        if self._rendered is None:
+            self._rendered = b"".join(family.render() for family in self.families.values())
+
+        return self._rendered
+
+    def _add_series(
+        self,
+        source: str,
+        key: str,
+    ) -> tuple[Family, str, tuple[str, ...] | None]:
+        """Return the family, rendered labels and enum states of a new series"""
+        device = self.devices.get(source)
+
+        if device is None and "/" in source:
+            kind, label = source.split("/", 1)
+            name = metric_name(NAMESPACE, kind, key)
+            labels, states = format_labels({KIND_LABELS.get(kind, "serial"): label}), None
+        elif device is None:
+            name, labels, states = metric_name(NAMESPACE, source, key), "", None
+        else:
+            name = metric_name(NAMESPACE, ESS_SUBSYSTEM, key)
+            labels = format_labels({"device": source, **device})
+            states = self.enums.get(source, {}).get(key)
+
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = Family(name)
+
+        return family, labels, states
@@ -0,0 +1,39 @@
+"""Latest values of the PVS and every ESS device"""
+
+import json
+from typing import Any
+
+
+class Snapshot:
+    """Last-value table keyed by source, the PVS power topic or an ESS device name
+
+    The JSON rendering is cached until the next update, so serving it costs a dict lookup.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty snapshot"""
+        self.values: dict[str, dict[str, Any]] = {}
+        self.timestamps: dict[str, float] = {}
+        self.version = 0
+        self._rendered: bytes | None = None
+
+    def update(self, source: str, values: dict[str, Any], timestamp: float) -> None:
+        """Merge values of a source sampled at timestamp, fields polled less often are kept"""
+        self.values.setdefault(source, {}).update(values)
+        self.timestamps[source] = timestamp
+        self.version += 1
+        self._rendered = None
+
+    def render(self) -> bytes:
+        """Return the snapshot as a JSON document"""
+        if self._rendered is None:
+            self._rendered = json.dumps(
+                {
+                    source: {"timestamp": self.timestamps[source], "values": values}
+                    for source, values in self.values.items()
+                },
+                separators=(",", ":"),
+                default=str,
+            ).encode()
+
+        return self._rendered
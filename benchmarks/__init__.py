@@ -0,0 +1 @@
+"""Microbenchmarks for the recorder hot paths"""
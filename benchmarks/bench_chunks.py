@@ -0,0 +1,92 @@
+"""Measure chunk compression and throughput on a synthetic day of samples"""
+
+import argparse
+import math
+import random
+import time
+
+from store.chunks import CODEC_XOR, HEADER, encode_chunk, iter_chunk
+
+DAY = 86400
+RAW_POINT_BYTES = 16
+
+
+def solar(second: float) -> float:
+    """Clear sky PV power in kW over the day"""
+    return max(0.0, 7.5 * math.sin(math.pi * (second - 6 * 3600) / (12 * 3600)))
+
+
+def make_series(start_ms: int) -> dict[str, tuple[list[int], list[float]]]:
+    """Build a day of PVS and ESS shaped series"""
+    series = {}
+
+    def sample(interval: int, value: object) -> tuple[list[int], list[float]]:
+        timestamps = [
+            start_ms + second * 1000 + random.randrange(-20, 20)  # noqa: S311
+            for second in range(0, DAY, interval)
+        ]
+        return timestamps, [value(second) for second in range(0, DAY, interval)]
+
+    # PVS window means, arbitrary floats
+    series["pv_p"] = sample(10, lambda s: solar(s) * random.uniform(0.97, 1.03))  # noqa: S311
+    # Modbus registers scaled by 0.001 and 0.01
+    series["battery_voltage"] = sample(5, lambda _s: (52000 + random.randrange(-200, 200)) * 0.001)  # noqa: S311
+    series["bms_current"] = sample(5, lambda _s: random.randrange(-3000, 3000) * 0.01)  # noqa: S311
+    # Slowly changing integers
+    series["soc"] = sample(5, lambda s: float(40 + s // 2000))
+    series["grid_power"] = sample(5, lambda s: float(round(1500 - solar(s) * 1000)))
+
+    return series
+
+
+def main(chunk_seconds: int) -> None:
+    """Run the benchmark"""
+    random.seed(0)
+    series = make_series(int(time.time() * 1000) // 86400000 * 86400000)
+    span = chunk_seconds * 1000
+
+    print(  # noqa: T201
+        f"{'series':<16} {'points':>7} {'xor':>5} {'raw kB':>8} {'chunk kB':>9} "
+        f"{'B/pt':>6} {'ratio':>6} {'enc kpt/s':>10} {'dec kpt/s':>10}",
+    )
+
+    for name, (timestamps, values) in series.items():
+        groups: dict[int, list[int]] = {}
+        for index, ts in enumerate(timestamps):
+            groups.setdefault(ts // span, []).append(index)
+
+        started = time.perf_counter()
+        chunks = [
+            encode_chunk([timestamps[i] for i in group], [values[i] for i in group])
+            for group in groups.values()
+        ]
+        encoded = time.perf_counter() - started
+
+        started = time.perf_counter()
+        decoded = [point for chunk in chunks for point in iter_chunk(chunk)]
+        decode_time = time.perf_counter() - started
+
+        if decoded != list(zip(timestamps, values, strict=True)):
+            msg = f"Decoded {name} does not match its input"
+            raise RuntimeError(msg)
+
+        count = len(timestamps)
+        size = sum(map(len, chunks))
+        xor = sum(HEADER.unpack_from(chunk)[0] == CODEC_XOR for chunk in chunks)
+        raw = count * RAW_POINT_BYTES
+        print(  # noqa: T201
+            f"{name:<16} {count:>7} {xor:>2}/{len(chunks):<2} {raw / 1024:>8.1f} "
+            f"{size / 1024:>9.1f} {size / count:>6.2f} {raw / size:>5.1f}x "
+            f"{count / encoded / 1000:>10.1f} {count / decode_time / 1000:>10.1f}",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="bench_chunks",
+        description="Benchmark chunk compression on a synthetic day of samples",
+    )
+    parser.add_argument("-c", "--chunk-seconds", type=int, default=3600)
+    args = parser.parse_args()
+
+    main(args.chunk_seconds)
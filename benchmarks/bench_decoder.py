@@ -0,0 +1,80 @@
+"""Compare per-field register decoding with bulk block decoding"""
+
+import argparse
+import random
+import timeit
+from array import array
+
+from ess.modbus.decoder import PayloadDecoder
+
+FIELD_DECODERS = {
+    "h": (1, PayloadDecoder.decode_int16),
+    "H": (1, PayloadDecoder.decode_uint16),
+    "l": (2, PayloadDecoder.decode_int32),
+    "L": (2, PayloadDecoder.decode_uint32),
+}
+
+
+def make_fields(count: int) -> list[tuple[int, str]]:
+    """Build a layout of mixed 16 and 32 bit fields with occasional gaps"""
+    fields = []
+    offset = 0
+    formats = list(FIELD_DECODERS)
+
+    while len(fields) < count:
+        fmt = formats[len(fields) % len(formats)]
+        fields.append((offset, fmt))
+        offset += FIELD_DECODERS[fmt][0] + (1 if len(fields) % 5 == 0 else 0)
+
+    return fields
+
+
+def per_field(registers: list[int], fields: list[tuple[int, str]]) -> list[int]:
+    """Decode each field separately, as the read_* helpers do"""
+    values = []
+    for offset, fmt in fields:
+        size, decode = FIELD_DECODERS[fmt]
+        values.append(decode(registers[offset : offset + size]))
+    return values
+
+
+def main(field_count: int, number: int) -> None:
+    """Run the benchmark"""
+    fields = make_fields(field_count)
+    register_count = fields[-1][0] + FIELD_DECODERS[fields[-1][1]][0]
+    registers = [random.randrange(65536) for _ in range(register_count)]  # noqa: S311
+    layout = PayloadDecoder.compile_layout(fields)
+    buffer = PayloadDecoder.to_buffer(registers)
+    block = array("H", registers)
+
+    if list(PayloadDecoder.decode_block(registers, layout)) != per_field(registers, fields):
+        msg = "Bulk and per-field decoding disagree"
+        raise RuntimeError(msg)
+
+    cases = {
+        "per-field decode_*": lambda: per_field(registers, fields),
+        "decode_block(list)": lambda: PayloadDecoder.decode_block(registers, layout),
+        "decode_block(array)": lambda: PayloadDecoder.decode_block(block, layout),
+        "decode_block(bytes)": lambda: PayloadDecoder.decode_block(buffer, layout),
+    }
+
+    print(f"{len(fields)} fields over {register_count} registers, {number} iterations")  # noqa: T201
+    baseline = None
+    for name, case in cases.items():
+        elapsed = min(timeit.repeat(case, number=number, repeat=5))
+        baseline = baseline or elapsed
+        print(  # noqa: T201
+            f"{name:<22} {elapsed / number * 1e6:8.2f} us/block  {baseline / elapsed:5.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="bench_decoder",
+        description="Benchmark per-field and bulk register decoding",
+    )
+    parser.add_argument("-f", "--fields", type=int, default=40)
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    main(args.fields, args.number)
@@ -0,0 +1,121 @@
+"""Compare DeviceList parsing paths on a large synthetic DeviceList"""
+
+import argparse
+import random
+import timeit
+
+from pvs.pvs_detail import (
+    PARSE_LEAN,
+    PARSE_VALIDATED,
+    PVSDetail,
+    PVSMeter,
+    PVSSolarInverter,
+    SolarPanel,
+    is_solar_inverter,
+)
+
+
+def make_device_list(inverter_count: int) -> dict:
+    """Build a DeviceList with two meters and inverter_count panel microinverters"""
+    meters = [
+        {
+            **dict.fromkeys(PVSMeter.model_fields, "0"),
+            "ISDETAIL": True,
+            "SERIAL": f"PVS6M0000{index}p",
+            "DEVICE_TYPE": "Power Meter",
+        }
+        for index in range(2)
+    ]
+    inverters = [
+        {
+            **dict.fromkeys(PVSSolarInverter.model_fields, "0"),
+            "ISDETAIL": True,
+            "SERIAL": f"E00122{index:08d}",
+            "TYPE": "SOLARBRIDGE",
+            "DEVICE_TYPE": "Inverter",
+            "MODEL": "AC_Module_Type_E",
+            "DESCR": f"Inverter E00122{index:08d}",
+            "slave": 0,
+            "DATATIME": "2025,07,28,19,15,00",
+            "ltea_3phsum_kwh": f"{random.uniform(100, 2000):.4f}",  # noqa: S311
+            "p_3phsum_kw": f"{random.uniform(0, 0.35):.4f}",  # noqa: S311
+            "p_mppt1_kw": f"{random.uniform(0, 0.35):.4f}",  # noqa: S311
+            "v_mppt1_v": f"{random.uniform(30, 55):.2f}",  # noqa: S311
+            "i_mppt1_a": f"{random.uniform(0, 8):.2f}",  # noqa: S311
+        }
+        for index in range(inverter_count)
+    ]
+    return {"devices": meters + inverters, "result": "succeed"}
+
+
+def per_device_models(detail: PVSDetail) -> list[SolarPanel]:
+    """Build a pydantic model per device and copy it, as get_solar_inverters used to"""
+    return [
+        SolarPanel(
+            serial=inverter.SERIAL,
+            model=inverter.MODEL,
+            description=inverter.DESCR,
+            power=inverter.p_mppt1_w,
+            voltage=inverter.v_mppt1_v,
+            current=inverter.i_mppt1_a,
+            energy=inverter.ltea_3phsum_kwh,
+        )
+        for inverter in (
+            PVSSolarInverter(**device)
+            for device in detail.pvs_detail_raw["devices"]
+            if is_solar_inverter(device)
+        )
+    ]
+
+
+def full_update(detail: PVSDetail) -> None:
+    """Update the fleet as if every inverter had new readings"""
+    detail.datatimes.clear()
+    detail.update_fleet()
+
+
+def main(inverter_count: int, number: int) -> None:
+    """Run the benchmark"""
+    random.seed(0)
+    device_list = make_device_list(inverter_count)
+
+    validated = PVSDetail("localhost", parse_mode=PARSE_VALIDATED)
+    lean = PVSDetail("localhost", parse_mode=PARSE_LEAN)
+    validated.pvs_detail_raw = lean.pvs_detail_raw = device_list
+
+    expected = per_device_models(validated)
+    for detail in (validated, lean):
+        if detail.get_solar_inverters() != expected:
+            msg = f"{detail.parse_mode} parsing does not match per-device models"
+            raise RuntimeError(msg)
+
+    cases = {
+        "per-device models": lambda: per_device_models(validated),
+        "validated (TypeAdapter)": validated.get_solar_inverters,
+        "lean": lean.get_solar_inverters,
+        "fleet columns + stats": lambda: full_update(lean),
+        "fleet, no new readings": lean.update_fleet,
+    }
+
+    print(f"{inverter_count} inverters, {number} iterations")  # noqa: T201
+    baseline = None
+    for name, case in cases.items():
+        elapsed = min(timeit.repeat(case, number=number, repeat=5))
+        baseline = baseline or elapsed
+        per_poll = elapsed / number
+        print(  # noqa: T201
+            f"{name:<24} {per_poll * 1e3:8.2f} ms/poll "
+            f"{per_poll / inverter_count * 1e6:8.2f} us/inverter  {baseline / elapsed:5.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="bench_devicelist",
+        description="Benchmark DeviceList parsing",
+    )
+    parser.add_argument("-i", "--inverters", type=int, default=500)
+    parser.add_argument("-n", "--number", type=int, default=20)
+    args = parser.parse_args()
+
+    main(args.inverters, args.number)
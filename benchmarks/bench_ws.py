@@ -0,0 +1,74 @@
+"""Compare WebSocket frame decoding with each available JSON codec"""
+
+import argparse
+import json
+import random
+import timeit
+from pathlib import Path
+
+from recorder.codec import FrameCodec, PowerSample, available_codecs
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "ws_example.json"
+
+
+def make_frames(count: int) -> list[str]:
+    """Build power frames shaped like ws_example.json with varying values"""
+    example = json.loads(EXAMPLE.read_text())
+    frames = []
+
+    for index in range(count):
+        params = {
+            key: value + index if isinstance(value, int) else value * random.uniform(0.5, 1.5)  # noqa: S311
+            for key, value in example["params"].items()
+        }
+        frames.append(json.dumps({"notification": example["notification"], "params": params}))
+
+    return frames
+
+
+def stdlib_power(frame: str) -> PowerSample | None:
+    """Parse a frame into a dict and pick the params, as the recorder used to"""
+    data = json.loads(frame)
+    if data.get("notification") != "power":
+        return None
+    params = data.get("params")
+    return PowerSample(*map(params.get, PowerSample._fields))
+
+
+def main(frame_count: int, number: int) -> None:
+    """Run the benchmark"""
+    frames = make_frames(frame_count)
+    other = json.dumps({"notification": "status", "params": {"state": "online"}})
+    codecs = {name: FrameCodec(name) for name in available_codecs()}
+
+    for codec in codecs.values():
+        if [codec.decode_power(frame) for frame in frames] != list(map(stdlib_power, frames)):
+            msg = f"{codec.name} and stdlib decoding disagree"
+            raise RuntimeError(msg)
+
+    cases = {"json.loads + dict": lambda: [stdlib_power(frame) for frame in frames]}
+    for name, codec in codecs.items():
+        cases[f"{name} decode_power"] = lambda codec=codec: list(map(codec.decode_power, frames))
+    cases["is_power (reject)"] = lambda: [FrameCodec.is_power(other) for _ in frames]
+
+    print(f"{len(frames)} frames of ~{len(frames[0])} bytes, {number} iterations")  # noqa: T201
+    baseline = None
+    for name, case in cases.items():
+        elapsed = min(timeit.repeat(case, number=number, repeat=5))
+        baseline = baseline or elapsed
+        per_frame = elapsed / number / len(frames)
+        print(  # noqa: T201
+            f"{name:<22} {per_frame * 1e6:8.2f} us/frame  {baseline / elapsed:5.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="bench_ws",
+        description="Benchmark WebSocket power frame decoding",
+    )
+    parser.add_argument("-f", "--frames", type=int, default=100)
+    parser.add_argument("-n", "--number", type=int, default=1000)
+    args = parser.parse_args()
+
+    main(args.frames, args.number)
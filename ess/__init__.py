@@ -3,11 +3,19 @@
 import asyncio
 import json
 import logging
+import time
+from collections.abc import Iterable
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-from .devices import Bms, Gateway, Gateway503, Inverter, Inverter503
-from .modbus import ModbusClient
+from stats import STATS, timed
+from stats.trace import TRACER
+
+from .devices import Bms, Device, Gateway, Gateway503, Inverter, Inverter503
+from .devices.register_map import POLL_CLASSES, POLL_FAST, POLL_SLOW, POLL_STATIC
+from .modbus import DEFAULT_MAX_GAP, AsyncModbusClient
+from .modbus.breaker import CLOSED, HALF_OPEN, OPEN
+from .scheduler import FixedRateScheduler
 
 if TYPE_CHECKING:
     from collections.abc import Callable
@@ -18,23 +26,51 @@ DEVICE_MAP = {
     "Bms": {"502": Bms},
 }
 
+# Breaker states ordered from healthy to down, used to report the worst state of a device
+BREAKER_SEVERITY = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
 logger = logging.getLogger(__name__)
 
 
 class ESS:
     """ESS"""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         ess_ip: str,
         ess_port502: int,
         ess_port503: int,
         device_file: str,
+        *,
+        max_read_gap: int = DEFAULT_MAX_GAP,
+        poll_interval: float = 5,
+        slow_interval: float = 60,
+        poll_deadline: float | None = None,
+        request_timeout: float = 2,
+        device_budget: float | None = None,
+        failure_threshold: int = 3,
+        connections: int = 1,
+        max_concurrency: int | None = None,
     ) -> None:
-        """Initialize the ESS"""
+        """Initialize the ESS
+
+        Each cycle publishes what was read within poll_deadline seconds (the poll interval when
+        unset), devices that have not answered by then are published with their cached values.
+        Each device poll is bounded by device_budget, the poll deadline when unset. Each port
+        gets connections Modbus sessions with devices spread across them. The 502
+        and 503 ports and the sessions are polled concurrently, with at most max_concurrency
+        devices of each port in flight at once (one per session when unset).
+        """
         self.ess_ip = ess_ip
         self.ess_port502 = ess_port502
         self.ess_port503 = ess_port503
+        self.poll_interval = poll_interval
+        self.slow_interval = slow_interval
+        self.last_slow_poll: float | None = None
+        self.poll_deadline = poll_deadline if poll_deadline is not None else poll_interval
+        self.device_budget = device_budget if device_budget is not None else self.poll_deadline
+        # Cycles are bounded by query_devices, which keeps the results read so far
+        self.scheduler = FixedRateScheduler(poll_interval)
 
         with Path.open(device_file, "r") as f:
             self.device_map = json.load(f)
@@ -42,68 +78,229 @@ class ESS:
         self.on_message: Callable[[str], None] | None = None
         self.running = False
 
-        self.client502 = ModbusClient(
-            ip=self.ess_ip,
-            port=self.ess_port502,
-        )
-        self.client503 = ModbusClient(
-            ip=self.ess_ip,
-            port=self.ess_port503,
-        )
+        self.clients = {
+            port: [
+                AsyncModbusClient(
+                    ip=self.ess_ip,
+                    port=port_number,
+                    max_read_gap=max_read_gap,
+                    timeout=request_timeout,
+                    failure_threshold=failure_threshold,
+                )
+                for _ in range(max(1, connections))
+            ]
+            for port, port_number in (("502", self.ess_port502), ("503", self.ess_port503))
+        }
+        self.client502 = self.clients["502"][0]
+        self.client503 = self.clients["503"][0]
+        # A slow port must not take the slots devices of the other port are waiting for
+        self.poll_limits = {
+            port: asyncio.Semaphore(max_concurrency or max(1, connections)) for port in self.clients
+        }
 
     def publish_message(self, data: any) -> None:
         """Publishes a message to the mqtt broker"""
         self.mqtt.publish(data)
 
-    def connect(self) -> None:
-        """Connect to the ESS"""
-        self.client502.connect()
-        self.client503.connect()
+    @property
+    def connected(self) -> bool:
+        """Whether every Modbus session is connected"""
+        return all(client.connected for clients in self.clients.values() for client in clients)
+
+    def disconnected(self) -> list[AsyncModbusClient]:
+        """Return the Modbus sessions that are not connected"""
+        return [
+            client
+            for clients in self.clients.values()
+            for client in clients
+            if not client.connected
+        ]
+
+    async def connect(self, clients: Iterable[AsyncModbusClient] | None = None) -> None:
+        """Connect the given Modbus sessions to the ESS, every session when None"""
+        if clients is None:
+            clients = [client for port_clients in self.clients.values() for client in port_clients]
+        await asyncio.gather(*(client.connect() for client in clients))
 
     async def run(self) -> None:
         """Run the ESS"""
         self.running = True
+        await self.scheduler.run(self.poll_cycle)
 
-        while self.running:
-            if not self.client502.connected or not self.client503.connected:
-                self.connect()
-                self.init_devices()
+    async def poll_cycle(self) -> None:
+        """Poll the due fields of every device and hand them to on_message"""
+        with TRACER.span("ess.poll_cycle"):
+            down = self.disconnected()
+            if down:
+                with TRACER.span("ess.connect", sessions=len(down)):
+                    await self.connect(down)
+                    # Only devices of sessions that came back lose their cached values, those
+                    # of healthy sessions keep them and sessions still down are retried next cycle
+                    self.init_devices([client for client in down if client.connected])
 
-            data = self.query_devices()
+            # Decided after a reconnect, which makes the slow fields of reset devices due
+            polls = self.due_polls()
+            with TRACER.span("ess.query", polls=polls):
+                data = await self.query_devices(polls)
             self.on_message(data)
 
-            if not self.running:
-                break
-            await asyncio.sleep(5)
+    def due_polls(self) -> tuple[str, ...]:
+        """Return the poll classes due this cycle
 
-    def query_devices(self) -> dict:
-        """Query all devices"""
-        data = {}
-        for device in self.device_map:
-            data_502 = device.get("502").get_data() if "502" in device else {}
-            data_503 = device.get("503").get_data() if "503" in device else {}
+        Static fields are added per device until they have been read on the current connection.
+        """
+        now = time.monotonic()
+
+        if self.last_slow_poll is None or now - self.last_slow_poll >= self.slow_interval:
+            self.last_slow_poll = now
+            return (POLL_SLOW, POLL_FAST)
 
-            data[device.get("name")] = {**data_502, **data_503}
+        return (POLL_FAST,)
+
+    @timed("ess.query_devices")
+    async def query_devices(self, polls: Iterable[str] = POLL_CLASSES) -> dict:
+        """Query the given poll classes of all devices"""
+        polls = tuple(polls)
+        entries = [
+            (device, port)
+            for device in self.device_map
+            for port in ("502", "503")
+            if port in device
+        ]
+        tasks = [
+            asyncio.create_task(self.poll_device(device[port], polls, port))
+            for device, port in entries
+        ]
+        if not tasks:
+            return {}
+
+        try:
+            _done, pending = await asyncio.wait(tasks, timeout=self.poll_deadline)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if pending:
+            await asyncio.wait(pending)
+            msg = f"{len(pending)} devices did not answer within the {self.poll_deadline}s deadline"
+            logger.warning(msg)
+
+        data = {device.get("name"): {} for device in self.device_map}
+        for (device, port), task in zip(entries, tasks, strict=True):
+            if task in pending:
+                # Publish what the device answered before, like a device over its budget
+                device[port].client.breaker(device[port].device_id).record_failure()
+                data[device.get("name")].update(device[port].values)
+            else:
+                data[device.get("name")].update(task.result())
+
+        for device in self.device_map:
+            data[device.get("name")]["modbus_state"] = self.device_state(device)
 
         return data
 
-    def init_devices(self) -> None:
-        """Initialize all devices"""
+    async def poll_device(self, device: Device, polls: tuple[str, ...], port: str) -> dict:
+        """Poll a device on port, merging the due fields into its cached values"""
+        if POLL_STATIC not in polls and not device.static_loaded:
+            polls = (POLL_STATIC, *polls)
+
+        async with self.poll_limits[port]:
+            started = time.perf_counter() if STATS.enabled else 0.0
+            try:
+                return await self._poll_device(device, polls)
+            finally:
+                if started:
+                    STATS.since(f"ess.device.{port}.{device.device_id}", started)
+
+    async def _poll_device(self, device: Device, polls: tuple[str, ...]) -> dict:
+        """Poll a device within its budget"""
+        try:
+            async with asyncio.timeout(self.device_budget):
+                return await device.poll(polls)
+        except TimeoutError:
+            msg = f"Device {device.device_id} exceeded its {self.device_budget}s poll budget"
+            logger.warning(msg)
+            device.client.breaker(device.device_id).record_failure()
+            return dict(device.values)
+
+    def device_state(self, device: dict) -> str:
+        """Return the worst circuit breaker state across the ports of a device"""
+        states = [
+            device[port].client.breaker(device[port].device_id).state
+            for port in ("502", "503")
+            if port in device
+        ]
+        return max(states, key=BREAKER_SEVERITY.get, default=CLOSED)
+
+    def breaker_states(self) -> dict[str, dict[str, dict]]:
+        """Return the circuit breaker state of every device and port for monitoring"""
+        return {
+            device.get("name"): {
+                port: device[port].client.breaker(device[port].device_id).as_dict()
+                for port in ("502", "503")
+                if port in device
+            }
+            for device in self.device_map
+        }
+
+    def deadbands(self) -> dict[str, dict[str, tuple[float, float]]]:
+        """Return the change-only publishing deadbands of every device's fields"""
+        deadbands = {}
+
         for device in self.device_map:
-            if "502" in DEVICE_MAP.get(device.get("type"), None) and "502" not in device:
-                device["502"] = DEVICE_MAP.get(device["type"])["502"](
-                    self.client502,
-                    device.get("device_id"),
-                )
+            merged = deadbands.setdefault(device.get("name"), {})
+            for device_class in DEVICE_MAP.get(device.get("type"), {}).values():
+                merged.update(device_class.REGISTER_MAP.deadbands)
 
-            if "503" in DEVICE_MAP.get(device.get("type"), None) and "503" not in device:
-                device["503"] = DEVICE_MAP.get(device["type"])["503"](
-                    self.client503,
-                    device.get("device_id"),
-                )
+        return deadbands
+
+    def enums(self) -> dict[str, dict[str, tuple[str, ...]]]:
+        """Return the possible states of every device's enum fields, including modbus_state"""
+        enums = {}
+
+        for device in self.device_map:
+            merged = enums.setdefault(device.get("name"), {})
+            for device_class in DEVICE_MAP.get(device.get("type"), {}).values():
+                merged.update(device_class.REGISTER_MAP.enums)
+            merged["modbus_state"] = tuple(BREAKER_SEVERITY)
+
+        return enums
+
+    def device_info(self) -> dict[str, dict[str, str]]:
+        """Return the type and Modbus unit ID of every device"""
+        return {
+            device.get("name"): {
+                "type": str(device.get("type")),
+                "unit_id": str(device.get("device_id")),
+            }
+            for device in self.device_map
+        }
+
+    def init_devices(self, clients: Iterable[AsyncModbusClient] | None = None) -> None:
+        """Create missing devices and forget values cached on a previous connection
+
+        Only devices of the given sessions are reset, those of every session when None.
+        """
+        for index, device in enumerate(self.device_map):
+            for port in ("502", "503"):
+                if port in device:
+                    if clients is None or device[port].client in clients:
+                        device[port].reset()
+                        # Slow fields are read again by the next cycle
+                        self.last_slow_poll = None
+                elif port in DEVICE_MAP.get(device.get("type"), None):
+                    # Spread devices across the sessions of the port, a unit ID always keeps
+                    # the same session so its circuit breaker sees all of its requests
+                    port_clients = self.clients[port]
+                    device[port] = DEVICE_MAP.get(device["type"])[port](
+                        port_clients[index % len(port_clients)],
+                        device.get("device_id"),
+                    )
 
     async def stop(self) -> None:
         """Stop the ESS"""
         self.running = False
-        self.client502.disconnect()
-        self.client503.disconnect()
+        self.scheduler.stop()
+        for clients in self.clients.values():
+            for client in clients:
+                client.disconnect()
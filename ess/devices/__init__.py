@@ -1,15 +1,23 @@
 """Base module for ESS"""
 
 from .bms import Bms
+from .device import Device
 from .gateway import Gateway
 from .gateway503 import Gateway503
 from .inverter import Inverter
 from .inverter503 import Inverter503
+from .register_map import POLL_FAST, POLL_SLOW, POLL_STATIC, Field, RegisterMap
 
 __all__ = [
+    "POLL_FAST",
+    "POLL_SLOW",
+    "POLL_STATIC",
     "Bms",
+    "Device",
+    "Field",
     "Gateway",
     "Gateway503",
     "Inverter",
     "Inverter503",
+    "RegisterMap",
 ]
@@ -2,7 +2,8 @@
 
 from enum import Enum
 
-from ess.modbus import ModbusClient
+from .device import Device
+from .register_map import POLL_FAST, POLL_STATIC, Field, RegisterMap
 
 
 class BatteryType(Enum):
@@ -76,143 +77,54 @@ class ControlMode(Enum):
         return self.name.replace("_", " ").title()
 
 
-class Bms:
+ALARM_EVENTS = (
+    "CommunicationError",
+    "OverTemperatureAlarm",
+    "OverTemperatureWarning",
+    "UnderTemperatureAlarm",
+    "UnderTemperatureWarning",
+    "OverChargeCurrentAlarm",
+    "OverChargeCurrentWarning",
+    "OverDischargeCurrentAlarm",
+    "OverDischargeCurrentWarning",
+    "OverVoltageAlarm",
+    "OverVoltageWarning",
+    "UnderVoltageAlarm",
+    "UnderVoltageWarning",
+    "UnderStateofChargeMinAlarm",
+    "UnderStateofChargeMinWarning",
+    "OverStateofChargeMaxAlarm",
+    "OverStateofChargeMaxWarning",
+    "VoltageImbalanceWarning",
+    "TemperatureImbalanceAlarm",
+    "TemperatureImbalanceWarning",
+    "ContactorError",
+    "FanError",
+    "GroundFaultError",
+)
+
+
+class Bms(Device):
     """BMS device"""
 
-    def __init__(self, client: ModbusClient, device_id: int) -> None:
-        """Initialize the BMS device"""
-        self.client = client
-        self.device_id = device_id
-
-    @property
-    def manufacturer(self) -> str:
-        """Manufacturer"""
-        return self.client.read_str(40004, 32, self.device_id)
-
-    @property
-    def model(self) -> str:
-        """Model"""
-        return self.client.read_str(40020, 32, self.device_id)
-
-    @property
-    def version(self) -> str:
-        """Version"""
-        return self.client.read_str(40044, 16, self.device_id)
-
-    @property
-    def serial(self) -> str:
-        """Serial"""
-        return self.client.read_str(40052, 32, self.device_id)
-
-    @property
-    def full_charge_capacity(self) -> int:
-        """Full Charge Capacity (mAh)"""
-        return self.client.read_uint16(40072, self.device_id) or 0
-
-    @property
-    def energy_capacity(self) -> int:
-        """Nameplate Energy Capacity"""
-        return self.client.read_uint16(40073, self.device_id) or 0
-
-    @property
-    def max_charge_rate(self) -> int:
-        """Nameplate Max Charge Rate"""
-        return self.client.read_uint16(40074, self.device_id) or 0
-
-    @property
-    def max_discharge_rate(self) -> int:
-        """Nameplate Max Discharge Rate"""
-        return self.client.read_uint16(40075, self.device_id) or 0
-
-    @property
-    def soc(self) -> int:
-        """State of Charge (%)"""
-        return self.client.read_uint16(40081, self.device_id) or 0
-
-    @property
-    def control_mode(self) -> ControlMode:
-        """Control Mode"""
-        value = self.client.read_uint16(40087, self.device_id)
-        return ControlMode(value) if value is not None else None
-
-    @property
-    def battery_type(self) -> BatteryType:
-        """Battery Type"""
-        value = self.client.read_uint16(40091, self.device_id)
-        return BatteryType(value) if value is not None else None
-
-    @property
-    def battery_state(self) -> BatteryState | None:
-        """Battery State"""
-        value = self.client.read_uint16(40092, self.device_id)
-        return BatteryState(value) if value is not None else None
-
-    @property
-    def state(self) -> State | None:
-        """State"""
-        value = self.client.read_uint16(40093, self.device_id)
-        return State(value) if value is not None else None
-
-    @property
-    def alerm_events(self) -> dict[str, bool]:
-        """Alarm Event Map 1"""
-        value = self.client.read_uint32(40096, self.device_id) or 0
-        bit_events = [
-            "CommunicationError",
-            "OverTemperatureAlarm",
-            "OverTemperatureWarning",
-            "UnderTemperatureAlarm",
-            "UnderTemperatureWarning",
-            "OverChargeCurrentAlarm",
-            "OverChargeCurrentWarning",
-            "OverDischargeCurrentAlarm",
-            "OverDischargeCurrentWarning",
-            "OverVoltageAlarm",
-            "OverVoltageWarning",
-            "UnderVoltageAlarm",
-            "UnderVoltageWarning",
-            "UnderStateofChargeMinAlarm",
-            "UnderStateofChargeMinWarning",
-            "OverStateofChargeMaxAlarm",
-            "OverStateofChargeMaxWarning",
-            "VoltageImbalanceWarning",
-            "TemperatureImbalanceAlarm",
-            "TemperatureImbalanceWarning",
-            "ContactorError",
-            "FanError",
-            "GroundFaultError",
-        ]
-        return {event: bool((value >> i) & 1) for i, event in enumerate(bit_events)}
-
-    @property
-    def voltage(self) -> int:
-        """Voltage (V)"""
-        value = self.client.read_uint16(40104, self.device_id) or 0
-        return value * 0.01
-
-    @property
-    def current(self) -> int:
-        """Current (A)"""
-        value = self.client.read_int16(40114, self.device_id) or 0
-        return value * 0.01
-
-    @property
-    def power(self) -> int:
-        """Power (W)"""
-        value = self.client.read_int16(40115, self.device_id) or 0
-        return value * 0.01
-
-    def get_data(self) -> dict:
-        """Get all data"""
-        return {
-            "manufacturer": self.manufacturer,
-            "model": self.model,
-            "version": self.version,
-            "serial": self.serial,
-            "battery_type": self.battery_type.name,
-            "state": self.state.name,
-            "voltage": self.voltage,
-            "current": self.current,
-            "power": self.power,
-            "soc": self.soc,
-        }
+    REGISTER_MAP = RegisterMap(
+        [
+            Field("manufacturer", 40004, "str", length=32, poll=POLL_STATIC),
+            Field("model", 40020, "str", length=32, poll=POLL_STATIC),
+            Field("version", 40044, "str", length=16, poll=POLL_STATIC),
+            Field("serial", 40052, "str", length=32, poll=POLL_STATIC),
+            Field("full_charge_capacity", 40072),  # mAh
+            Field("energy_capacity", 40073),
+            Field("max_charge_rate", 40074),
+            Field("max_discharge_rate", 40075),
+            Field("soc", 40081, poll=POLL_FAST),  # %
+            Field("control_mode", 40087, enum=ControlMode),
+            Field("battery_type", 40091, enum=BatteryType, poll=POLL_STATIC),
+            Field("battery_state", 40092, enum=BatteryState),
+            Field("state", 40093, enum=State, poll=POLL_FAST),
+            Field("alarm_events", 40096, "uint32", flags=ALARM_EVENTS),
+            Field("voltage", 40104, scale=0.01, poll=POLL_FAST, deadband=0.05),  # V
+            Field("current", 40114, "int16", scale=0.01, poll=POLL_FAST, deadband=0.05),  # A
+            Field("power", 40115, "int16", scale=0.01, poll=POLL_FAST, deadband=5),  # W
+        ],
+    )
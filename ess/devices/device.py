@@ -0,0 +1,66 @@
+"""Base ESS device"""
+
+from collections.abc import Iterable
+from typing import Any
+
+from ess.modbus import AsyncModbusClient
+from stats.trace import TRACER
+
+from .register_map import POLL_STATIC, RegisterMap
+
+
+class Device:
+    """Base class for ESS devices described by a register map"""
+
+    REGISTER_MAP: RegisterMap
+
+    def __init__(self, client: AsyncModbusClient, device_id: int) -> None:
+        """Initialize the device"""
+        self.client = client
+        self.device_id = device_id
+        self.values: dict[str, Any] = {}
+
+    @property
+    def static_loaded(self) -> bool:
+        """Whether every static field has been read since the last reset"""
+        return all(
+            self.values.get(name) is not None
+            for name in self.REGISTER_MAP.poll_classes[POLL_STATIC]
+        )
+
+    def reset(self) -> None:
+        """Forget cached values, e.g. after a reconnect"""
+        self.values.clear()
+
+    async def read(self, *names: str) -> dict[str, Any]:
+        """Read the named fields"""
+        plan = self.REGISTER_MAP.plan(names, self.client.max_read_gap)
+        return plan.decode(await self.client.read_blocks(plan.blocks, self.device_id))
+
+    async def write(self, name: str, value: Any) -> None:  # noqa: ANN401
+        """Write a writable field"""
+        field = self.REGISTER_MAP.fields[name]
+        raw = self.REGISTER_MAP.encode(name, value)
+        await getattr(self.client, f"write_{field.data_type}")(field.address, raw, self.device_id)
+
+    async def poll(self, polls: Iterable[str]) -> dict[str, Any]:
+        """Read the fields of the due poll classes merged into the cached values
+
+        When any block cannot be read, e.g. while the circuit breaker is open, the cached values
+        are returned unchanged rather than merging in the defaults of the unread fields.
+        """
+        names = self.REGISTER_MAP.poll_fields(polls)
+
+        with TRACER.span("device.poll", device=type(self).__name__, unit_id=self.device_id):
+            if names:
+                plan = self.REGISTER_MAP.plan(names, self.client.max_read_gap)
+                snapshot = await self.client.read_blocks(plan.blocks, self.device_id)
+                if snapshot.complete:
+                    self.values.update(plan.decode(snapshot))
+
+        return dict(self.values)
+
+    async def get_data(self) -> dict[str, Any]:
+        """Get all published data"""
+        with TRACER.span("device.get_data", device=type(self).__name__, unit_id=self.device_id):
+            return await self.read(*self.REGISTER_MAP.publish_fields)
@@ -2,7 +2,8 @@
 
 from enum import Enum
 
-from ess.modbus import ModbusClient
+from .device import Device
+from .register_map import POLL_FAST, POLL_STATIC, Field, RegisterMap
 
 
 class BatteryState(Enum):
@@ -44,164 +45,45 @@ class BatteryType(Enum):
         return self.name.replace("_", " ").title()
 
 
-class Gateway:
+class Gateway(Device):
     """Gateway device"""
 
-    def __init__(self, client: ModbusClient, device_id: int) -> None:
-        """Initialize the Gateway device"""
-        self.client = client
-        self.device_id = device_id
-
-    @property
-    def manufacturer(self) -> str:
-        """Manufacturer"""
-        return self.client.read_str(40004, 32, self.device_id)
-
-    @property
-    def model(self) -> str:
-        """Model"""
-        return self.client.read_str(40020, 32, self.device_id)
-
-    @property
-    def version(self) -> str:
-        """Version"""
-        return self.client.read_str(40044, 16, self.device_id)
-
-    @property
-    def serial(self) -> str:
-        """Serial"""
-        return self.client.read_str(40052, 32, self.device_id)
-
-    @property
-    def max_power_output_watt(self) -> int:
-        """Setting for maximum power output."""
-        return self.client.read_uint16(40152, self.device_id)
-
-    def set_max_power_output_watt(self, value: int) -> None:
-        """Setting for maximum power output."""
-        self.client.write_uint16(40152, value, self.device_id)
-
-    @property
-    def max_output_percent(self) -> int:
-        """Set power output to specified level"""
-        return self.client.read_uint16(40187, self.device_id)
-
-    def set_max_output_percent(self, value: int) -> None:
-        """Set power output to specified level"""
-        self.client.write_uint16(40187, value, self.device_id)
-
-    @property
-    def max_charging(self) -> int:
-        """Setpoint for maximum charge."""
-        return self.client.read_uint16(40211, self.device_id)
-
-    def set_max_charging(self, value: int) -> None:
-        """Setpoint for maximum charge."""
-        self.client.write_uint16(40211, value, self.device_id)
-
-    @property
-    def setpoint_max_charge(self) -> int:
-        """Setpoint for maximum charge (W)."""
-        return self.client.read_uint16(40210, self.device_id)
-
-    def set_setpoint_max_charge(self, value: int) -> None:
-        """Set setpoint for maximum charge (W)."""
-        self.client.write_uint16(40210, value, self.device_id)
-
-    @property
-    def storage_control_mode(self) -> int:
-        """hold/discharge/charge storage control mode."""
-        return self.client.read_uint16(40213, self.device_id)
-
-    @property
-    def available_energy(self) -> int:
-        """Currently available energy as a percent of the capacity rating."""
-        return self.client.read_uint32(40216, self.device_id)
-
-    @property
-    def energy_capacity(self) -> int:
-        """Nameplate energy capacity in DC watt-hours."""
-        return self.client.read_uint16(40247, self.device_id)
-
-    @property
-    def max_reserve_1(self) -> int:
-        """Setpoint for maximum reserve for storage
-
-        As a percentage of the nominal maximum storage.
-        """
-        return self.client.read_uint16(40253, self.device_id)
-
-    @property
-    def max_reserve_2(self) -> int:
-        """Setpoint for maximum reserve for storage
-
-        As a percentage of the nominal maximum storage.
-        """
-        return self.client.read_uint16(40254, self.device_id)
-
-    @property
-    def battery_soc(self) -> int:
-        """State of charge of the battery bank."""
-        return self.client.read_uint16(40255, self.device_id)
-
-    @property
-    def charge_status(self) -> int:
-        """Current charge status of the battery bank."""
-        value = self.client.read_uint16(40260, self.device_id)
-
-        return BatteryState(value)
-
-    @property
-    def battery_type(self) -> BatteryType:
-        """Type of battery bank."""
-        value = self.client.read_uint16(40265, self.device_id)
-        return BatteryType(value)
-
-    @property
-    def battery_state(self) -> BatteryState:
-        """Current state of the battery bank."""
-        value = self.client.read_uint16(40266, self.device_id)
-        return BatteryState(value)
-
-    @property
-    def battery_power(self) -> int:
-        """Total power flowing to/from the battery bank."""
-        return self.client.read_int16(40291, self.device_id)
-
-    @property
-    def inverter_state(self) -> int:
-        """Current state of the inverter."""
-        return self.client.read_uint16(40295, self.device_id)
-
-    @property
-    def inverter_ac_power(self) -> int:
-        """Inverter-charger power module totalAC power"""
-        return self.client.read_int16(40084, self.device_id)
-
-    @property
-    def inverter_charger_dc_power(self) -> int:
-        """Inverter-charger power module DC power"""
-        return self.client.read_int16(40101, self.device_id)
-
-    @property
-    def inverter_charger_output_energy_lifetime(self) -> int:
-        """Inverter charger Power module Output Energy Lifetime"""
-        value = self.client.read_uint32(40094, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def inverter_charger_input_energy_lifetime(self) -> int:
-        """Inverter charger Power module Input Energy Lifetime"""
-        value = self.client.read_uint32(40310, self.device_id) or 0
-        return value * 0.001
-
-    def get_data(self) -> dict:
-        """Get all data"""
-        return {
-            "manufacturer": self.manufacturer,
-            "model": self.model,
-            "version": self.version,
-            "serial": self.serial,
-            "battery_soc": self.battery_soc,
-            "battery_state": self.battery_state.name,
-        }
+    REGISTER_MAP = RegisterMap(
+        [
+            Field("manufacturer", 40004, "str", length=32, poll=POLL_STATIC),
+            Field("model", 40020, "str", length=32, poll=POLL_STATIC),
+            Field("version", 40044, "str", length=16, poll=POLL_STATIC),
+            Field("serial", 40052, "str", length=32, poll=POLL_STATIC),
+            Field("inverter_ac_power", 40084, "int16", default=None),
+            Field(
+                "inverter_charger_output_energy_lifetime",
+                40094,
+                "uint32",
+                scale=0.001,
+                default=None,
+            ),  # kWh
+            Field("inverter_charger_dc_power", 40101, "int16", default=None),
+            Field("max_power_output_watt", 40152, default=None, writable=True),
+            Field("max_output_percent", 40187, default=None, writable=True),
+            Field("setpoint_max_charge", 40210, default=None, writable=True),  # W
+            Field("max_charging", 40211, default=None, writable=True),
+            Field("storage_control_mode", 40213, default=None),
+            Field("available_energy", 40216, "uint32", default=None),  # % of capacity
+            Field("energy_capacity", 40247, default=None),  # DC Wh
+            Field("max_reserve_1", 40253, default=None),  # % of nominal maximum storage
+            Field("max_reserve_2", 40254, default=None),  # % of nominal maximum storage
+            Field("battery_soc", 40255, default=None, poll=POLL_FAST),
+            Field("charge_status", 40260, enum=BatteryState),
+            Field("battery_type", 40265, enum=BatteryType),
+            Field("battery_state", 40266, enum=BatteryState, poll=POLL_FAST),
+            Field("battery_power", 40291, "int16", default=None),
+            Field("inverter_state", 40295, default=None),
+            Field(
+                "inverter_charger_input_energy_lifetime",
+                40310,
+                "uint32",
+                scale=0.001,
+                default=None,
+            ),  # kWh
+        ],
+    )
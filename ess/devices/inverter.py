@@ -2,7 +2,8 @@
 
 from enum import Enum
 
-from ess.modbus import ModbusClient
+from .device import Device
+from .register_map import POLL_FAST, POLL_STATIC, Field, RegisterMap
 
 
 class ChargerStatus(Enum):
@@ -72,146 +73,37 @@ class OperatingMode(Enum):
         return self.name.replace("_", " ").title()
 
 
-class Inverter:
+class Inverter(Device):
     """Inverter device"""
 
-    def __init__(self, client: ModbusClient, device_id: int) -> None:
-        """Initialize the Inverter device"""
-        self.client = client
-        self.device_id = device_id
-
-    @property
-    def manufacturer(self) -> str:
-        """Manufacturer"""
-        return self.client.read_str(40004, 32, self.device_id)
-
-    @property
-    def model(self) -> str:
-        """Model"""
-        return self.client.read_str(40020, 32, self.device_id)
-
-    @property
-    def version(self) -> str:
-        """Version"""
-        return self.client.read_str(40044, 16, self.device_id)
-
-    @property
-    def serial(self) -> str:
-        """Serial"""
-        return self.client.read_str(40052, 32, self.device_id)
-
-    @property
-    def inverter_charger_output_energy_lifetime(self) -> int:
-        """Energy at the XFMR Lifetime"""
-        value = self.client.read_uint32(40094, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def inverter_charger_dc_current(self) -> int:
-        """Inverter-charger power module DC current (A)"""
-        return self.client.read_uint16(40097, self.device_id) or 0
-
-    @property
-    def inverter_charger_dc_current_scaling(self) -> int:
-        """Inverter-charger power module DC current scaling factor (A)"""
-        value = self.client.read_int16(40098, self.device_id) or 0
-        return value * 0.1
-
-    @property
-    def inverter_charger_dc_voltage(self) -> int:
-        """Inverter-charger power module DC voltage (V)"""
-        value = self.client.read_uint16(40099, self.device_id) or 0
-        return value * 0.1
-
-    @property
-    def inverter_charger_dc_voltage_scaling(self) -> int:
-        """Inverter-charger power module DC voltage (V)"""
-        value = self.client.read_int16(40100, self.device_id) or 0
-        return value * 0.1
-
-    @property
-    def inverter_charger_dc_power(self) -> int:
-        """Inverter-charger power module DC power (W)"""
-        value = self.client.read_int16(40101, self.device_id) or 0
-        return value * 0.1
-
-    @property
-    def inverter_charger_dc_power_scaling(self) -> int:
-        """Inverter-charger power module DC power scaling factor"""
-        value = self.client.read_int16(40102, self.device_id) or 0
-        return value * 0.1
-
-    @property
-    def continuous_output_power(self) -> int:
-        """Continuous power output capability of the inverter - Max (W)"""
-        return self.client.read_int16(40125, self.device_id) or 0
-
-    @property
-    def power_output_percent(self) -> int:
-        """Set power output to specified level."""
-        value = self.client.read_uint16(40187, self.device_id) or 0
-        return value * 0.01
-
-    @property
-    def max_discharge_power_percent(self) -> int:
-        """EPC Maximum Discharge Power Percent"""
-        value = self.client.read_uint16(40220, self.device_id) or 0
-        return value * 0.01
-
-    def set_max_discharge_power_percent(self, value: int) -> None:
-        """EPC Maximum Discharge Power Percent"""
-        self.client.write_uint16(40220, value, self.device_id) * 100
-
-    @property
-    def max_charge_power_percent(self) -> int:
-        """EPC Maximum Charge Power Percent"""
-        value = self.client.read_uint16(40221, self.device_id) or 0
-        return value * 0.01
-
-    def set_max_charge_power_percent(self, value: int) -> None:
-        """EPC Maximum Charge Power Percent"""
-        self.client.write_uint16(40221, value * 100, self.device_id)
-
-    @property
-    def max_charge_power(self) -> int:
-        """Max charge power (W)"""
-        return self.client.read_uint16(40238, self.device_id) or 0
-
-    @property
-    def max_discharge_power(self) -> int:
-        """Max discharge power (W)"""
-        return self.client.read_uint16(40239, self.device_id) or 0
-
-    @property
-    def inverter_status(self) -> InverterStatus | None:
-        """Inverter status"""
-        value = self.client.read_uint16(40252, self.device_id)
-        return InverterStatus(value) if value is not None else None
-
-    @property
-    def charger_status(self) -> ChargerStatus | None:
-        """Inverter status"""
-        value = self.client.read_uint16(40253, self.device_id)
-        return ChargerStatus(value) if value is not None else None
-
-    @property
-    def mode(self) -> OperatingMode | None:
-        """Operating Mode"""
-        value = self.client.read_uint16(40241, self.device_id)
-        return OperatingMode(value) if value is not None else None
-
-    def set_mode(self, mode: OperatingMode) -> None:
-        """Set Operating Mode"""
-        self.client.write_uint16(40241, mode.value, self.device_id)
-
-    def get_data(self) -> dict:
-        """Get all data"""
-        return {
-            "manufacturer": self.manufacturer,
-            "model": self.model,
-            "version": self.version,
-            "serial": self.serial,
-            "mode": self.mode.name,
-            "inverter_status": self.inverter_status.name,
-            "charger_status": self.charger_status.name,
-        }
+    REGISTER_MAP = RegisterMap(
+        [
+            Field("manufacturer", 40004, "str", length=32, poll=POLL_STATIC),
+            Field("model", 40020, "str", length=32, poll=POLL_STATIC),
+            Field("version", 40044, "str", length=16, poll=POLL_STATIC),
+            Field("serial", 40052, "str", length=32, poll=POLL_STATIC),
+            # Energy at the XFMR lifetime
+            Field(
+                "inverter_charger_output_energy_lifetime",
+                40094,
+                "uint32",
+                scale=0.001,
+                default=None,
+            ),
+            Field("inverter_charger_dc_current", 40097),  # A
+            Field("inverter_charger_dc_current_scaling", 40098, "int16", scale=0.1),
+            Field("inverter_charger_dc_voltage", 40099, scale=0.1),  # V
+            Field("inverter_charger_dc_voltage_scaling", 40100, "int16", scale=0.1),
+            Field("inverter_charger_dc_power", 40101, "int16", scale=0.1),  # W
+            Field("inverter_charger_dc_power_scaling", 40102, "int16", scale=0.1),
+            Field("continuous_output_power", 40125, "int16"),  # W
+            Field("power_output_percent", 40187, scale=0.01),
+            Field("max_discharge_power_percent", 40220, scale=0.01, writable=True),
+            Field("max_charge_power_percent", 40221, scale=0.01, writable=True),
+            Field("max_charge_power", 40238),  # W
+            Field("max_discharge_power", 40239),  # W
+            Field("mode", 40241, enum=OperatingMode, poll=POLL_FAST, writable=True),
+            Field("inverter_status", 40252, enum=InverterStatus, poll=POLL_FAST),
+            Field("charger_status", 40253, enum=ChargerStatus, poll=POLL_FAST),
+        ],
+    )
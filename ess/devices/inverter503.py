@@ -2,7 +2,8 @@
 
 from enum import Enum
 
-from ess.modbus import ModbusClient
+from .device import Device
+from .register_map import POLL_FAST, POLL_SLOW, Field, RegisterMap
 
 
 class ChargerStatus(Enum):
@@ -83,190 +84,53 @@ class Enabled(Enum):
         return self.name.replace("_", " ").title()
 
 
-class Inverter503:
+class Inverter503(Device):
     """Inverter503 device"""
 
-    def __init__(self, client: ModbusClient, device_id: int) -> None:
-        """Initialize the Inverter503 device"""
-        self.client = client
-        self.device_id = device_id
-
-    @property
-    def dc_voltage(self) -> int:
-        """DC voltage"""
-        value = self.client.read_uint32(80, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def dc_current(self) -> int:
-        """DC current"""
-        value = self.client.read_int32(82, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac1_voltage(self) -> int:
-        """AC1 voltage"""
-        value = self.client.read_uint32(98, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac1_current(self) -> int:
-        """AC1 current"""
-        value = self.client.read_int32(100, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac1_power(self) -> int:
-        """AC1 power"""
-        return self.client.read_int32(102, self.device_id) or 0
-
-    @property
-    def ac1_l1_voltage(self) -> int:
-        """AC1 L1 voltage"""
-        value = self.client.read_uint32(110, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac1_l2_voltage(self) -> int:
-        """AC1 L2 voltage"""
-        value = self.client.read_uint32(114, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac1_l1_current(self) -> int:
-        """AC1 L1 current"""
-        value = self.client.read_int32(116, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac1_l2_current(self) -> int:
-        """AC1 L2 current"""
-        value = self.client.read_int32(112, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac_load_voltage(self) -> int:
-        """AC load voltage"""
-        value = self.client.read_uint32(140, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac_load_current(self) -> int:
-        """AC load current"""
-        value = self.client.read_int32(150, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac_load_power(self) -> int:
-        """AC load power"""
-        return self.client.read_int32(154, self.device_id) or 0
-
-    @property
-    def ac_load_l1_voltage(self) -> int:
-        """AC load L1 voltage"""
-        value = self.client.read_uint32(142, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac_load_l2_voltage(self) -> int:
-        """AC load L2 voltage"""
-        value = self.client.read_uint32(144, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac_load_l1_current(self) -> int:
-        """AC load L1 current"""
-        value = self.client.read_int32(146, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def ac_load_l2_current(self) -> int:
-        """AC load L2 current"""
-        value = self.client.read_int32(148, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def grid_input_energy_month(self) -> int:
-        """Grid input energy month"""
-        value = self.client.read_uint32(268, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def grid_input_energy_year(self) -> int:
-        """Grid input energy year"""
-        value = self.client.read_uint32(272, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def grid_output_energy_year(self) -> int:
-        """Grid output energy year"""
-        value = self.client.read_uint32(296, self.device_id) or 0
-        return value * 0.001
-
-    @property
-    def max_charge_rate(self) -> int:
-        """Maximum Charge Rate (%)"""
-        return self.client.read_uint16(367, self.device_id) or 0
-
-    def set_max_charge_rate(self, value: int) -> None:
-        """Maximum Charge Rate (%)"""
-        self.client.write_uint16(367, value, self.device_id)
-
-    @property
-    def charger_enabled(self) -> Enabled:
-        """Charger enabled"""
-        value = self.client.read_uint16(356, self.device_id) or 0
-        return Enabled(value)
-
-    def set_charger_enabled(self, enabled: Enabled) -> None:
-        """Charger enabled"""
-        self.client.write_uint16(356, enabled.value, self.device_id)
-
-    @property
-    def inverter_enabled(self) -> Enabled:
-        """Inverter enabled"""
-        value = self.client.read_uint16(353, self.device_id) or 0
-        return Enabled(value)
-
-    def set_inverter_enabled(self, enabled: Enabled) -> None:
-        """Inverter enabled"""
-        self.client.write_uint16(353, enabled.value, self.device_id)
-
-    @property
-    def max_discharge_current(self) -> int:
-        """Maximum discharge current"""
-        return self.client.read_uint16(468, self.device_id) or 0
-
-    @property
-    def max_sell_amps(self) -> float:
-        """Maximum Sell Amps"""
-        value = self.client.read_uint32(436, self.device_id) or 0
-        return value * 0.001
-
-    def set_max_sell_amps(self, value: float) -> None:
-        """Maximum Sell Amps"""
-        self.client.write_uint32(436, int(value * 1000), self.device_id)
-
-    @property
-    def load_shave_amps(self) -> float:
-        """Load Shave Amps"""
-        value = self.client.read_uint32(438, self.device_id) or 0
-        return value * 0.001
-
-    def reboot(self) -> None:
+    REGISTER_MAP = RegisterMap(
+        [
+            Field("dc_voltage", 80, "uint32", scale=0.001, poll=POLL_FAST, deadband=0.05),
+            Field("dc_current", 82, "int32", scale=0.001, poll=POLL_FAST, deadband=0.05),
+            Field("ac1_voltage", 98, "uint32", scale=0.001),
+            Field("ac1_current", 100, "int32", scale=0.001),
+            Field("ac1_power", 102, "int32", poll=POLL_FAST, deadband=5),
+            Field("ac1_l1_voltage", 110, "uint32", scale=0.001),
+            Field("ac1_l2_current", 112, "int32", scale=0.001),
+            Field("ac1_l2_voltage", 114, "uint32", scale=0.001),
+            Field("ac1_l1_current", 116, "int32", scale=0.001),
+            Field("ac_load_voltage", 140, "uint32", scale=0.001),
+            Field("ac_load_l1_voltage", 142, "uint32", scale=0.001),
+            Field("ac_load_l2_voltage", 144, "uint32", scale=0.001),
+            Field("ac_load_l1_current", 146, "int32", scale=0.001),
+            Field("ac_load_l2_current", 148, "int32", scale=0.001),
+            Field("ac_load_current", 150, "int32", scale=0.001),
+            Field("ac_load_power", 154, "int32"),
+            Field("grid_input_energy_month", 268, "uint32", scale=0.001, default=None),
+            Field(
+                "grid_input_energy_year",
+                272,
+                "uint32",
+                scale=0.001,
+                default=None,
+                poll=POLL_SLOW,
+            ),
+            Field(
+                "grid_output_energy_year",
+                296,
+                "uint32",
+                scale=0.001,
+                default=None,
+                poll=POLL_SLOW,
+            ),
+            Field("inverter_enabled", 353, enum=Enabled, poll=POLL_SLOW, writable=True),
+            Field("charger_enabled", 356, enum=Enabled, poll=POLL_SLOW, writable=True),
+            Field("max_charge_rate", 367, poll=POLL_SLOW, writable=True),  # %
+            Field("max_sell_amps", 436, "uint32", scale=0.001, writable=True),
+            Field("load_shave_amps", 438, "uint32", scale=0.001),
+            Field("max_discharge_current", 468, poll=POLL_SLOW),
+        ],
+    )
+
+    async def reboot(self) -> None:
         """Reboot the inverter"""
-        self.client.write_uint16(359, 0, self.device_id)
-
-    def get_data(self) -> dict:
-        """Get all data"""
-        return {
-            "dc_voltage": self.dc_voltage,
-            "dc_current": self.dc_current,
-            "ac1_power": self.ac1_power,
-            "charger_enabled": self.charger_enabled.name,
-            "max_charge_rate": self.max_charge_rate,
-            "inverter_enabled": self.inverter_enabled.name,
-            "max_discharge_current": self.max_discharge_current,
-            "grid_input_energy_year": self.grid_input_energy_year,
-            "grid_output_energy_year": self.grid_output_energy_year,
-        }
+        await self.client.write_uint16(359, 0, self.device_id)
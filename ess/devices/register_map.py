@@ -0,0 +1,221 @@
+"""Declarative register maps compiled into decode specs"""
+
+import struct
+from collections.abc import Iterable
+from enum import Enum
+from typing import Any, NamedTuple
+
+from ess.modbus import RegisterBlock, RegisterSnapshot, plan_reads
+from ess.modbus.decoder import PayloadDecoder
+
+# Poll classes: static fields are read once per connection, slow and fast fields every
+# slow and fast poll interval
+POLL_STATIC = "static"
+POLL_SLOW = "slow"
+POLL_FAST = "fast"
+POLL_CLASSES = (POLL_STATIC, POLL_SLOW, POLL_FAST)
+
+# struct format and register count per numeric register type
+REGISTER_TYPES = {
+    "int16": ("h", 1),
+    "uint16": ("H", 1),
+    "int32": ("i", 2),
+    "uint32": ("I", 2),
+}
+
+
+class Field(NamedTuple):
+    """A single value exposed by a device
+
+    Decoded values are raw * scale + offset. Fields with an enum decode to the member name,
+    fields with flags decode to a dict of bit name to state and str fields read length bytes.
+    Unreadable fields decode to default, the name of the member with that value for enums
+    (None without one) and None for str fields. Raw values no enum member has pass through.
+    Fields with a poll class are published by get_data. Changes within max(deadband,
+    rel_deadband * |last|) of the last published value are not published in change-only mode.
+    """
+
+    name: str
+    address: int
+    data_type: str = "uint16"
+    scale: float = 1
+    offset: float = 0
+    enum: type[Enum] | None = None
+    flags: tuple[str, ...] = ()
+    length: int = 0
+    default: Any = 0
+    poll: str | None = None
+    writable: bool = False
+    deadband: float = 0
+    rel_deadband: float = 0
+
+
+class DecodeSpec(NamedTuple):
+    """Precomputed decoding for a single field"""
+
+    name: str
+    address: int
+    count: int
+    fmt: str
+    unpack_from: Any
+    scaled: bool
+    scale: float
+    offset: float
+    names: dict[int, str] | None
+    flags: tuple[str, ...]
+    is_str: bool
+    default: Any
+
+
+def compile_field(field: Field) -> DecodeSpec:
+    """Compile a field into its decode spec"""
+    if field.data_type == "str":
+        if field.length <= 0:
+            msg = f"String field {field.name} needs a positive length"
+            raise ValueError(msg)
+        fmt, count = f"{field.length}s", (field.length + 1) // 2
+    elif field.data_type in REGISTER_TYPES:
+        fmt, count = REGISTER_TYPES[field.data_type]
+    else:
+        msg = f"Unknown register type {field.data_type} for field {field.name}"
+        raise ValueError(msg)
+
+    names = {member.value: member.name for member in field.enum} if field.enum else None
+    if names is not None:
+        default = names.get(field.default)
+    elif field.data_type == "str":
+        default = None
+    else:
+        default = field.default
+
+    return DecodeSpec(
+        name=field.name,
+        address=field.address,
+        count=count,
+        fmt=fmt,
+        unpack_from=struct.Struct(f">{fmt}").unpack_from,
+        scaled=field.scale != 1 or field.offset != 0,
+        scale=field.scale,
+        offset=field.offset,
+        names=names,
+        flags=field.flags,
+        is_str=field.data_type == "str",
+        default=default,
+    )
+
+
+class ReadPlan:
+    """Block reads and per-block decode specs for a set of fields"""
+
+    def __init__(self, specs: Iterable[DecodeSpec], max_gap: int) -> None:
+        """Plan the block reads covering specs"""
+        specs = sorted(specs, key=lambda spec: spec.address)
+        self.blocks: tuple[RegisterBlock, ...] = plan_reads(
+            ((spec.address, spec.count) for spec in specs),
+            max_gap=max_gap,
+        )
+        self.block_layouts = []
+
+        for block in self.blocks:
+            block_specs = [
+                spec
+                for spec in specs
+                if block.address <= spec.address < block.address + block.count
+            ]
+            layout = PayloadDecoder.compile_layout(
+                (spec.address - block.address, spec.fmt) for spec in block_specs
+            )
+            self.block_layouts.append((block, layout, block_specs))
+
+    def decode(self, snapshot: RegisterSnapshot) -> dict[str, Any]:
+        """Decode every planned field from the snapshot"""
+        data = {}
+        buffers = snapshot.buffers
+
+        for block, layout, specs in self.block_layouts:
+            buffer = buffers.get(block.address)
+
+            if buffer is not None and len(buffer) >= layout.size:
+                raws = layout.unpack_from(buffer)
+            else:
+                # The block read failed or came back short and may have been recovered span by span
+                raws = [self._unpack_span(snapshot, spec) for spec in specs]
+
+            for spec, raw in zip(specs, raws, strict=True):
+                if raw is None:
+                    value = spec.default
+                elif spec.names is not None:
+                    value = spec.names.get(raw, raw)
+                elif spec.flags:
+                    value = {flag: bool((raw >> bit) & 1) for bit, flag in enumerate(spec.flags)}
+                elif spec.is_str:
+                    value = raw.decode("utf-8", errors="replace").rstrip("\x00")
+                elif spec.scaled:
+                    value = raw * spec.scale + spec.offset
+                else:
+                    value = raw
+
+                data[spec.name] = value
+
+        return data
+
+    @staticmethod
+    def _unpack_span(snapshot: RegisterSnapshot, spec: DecodeSpec) -> Any:  # noqa: ANN401
+        """Unpack a single field from whichever buffer holds it"""
+        located = snapshot.locate(spec.address, spec.count)
+        return spec.unpack_from(*located)[0] if located is not None else None
+
+
+class RegisterMap:
+    """The fields of a device type"""
+
+    def __init__(self, fields: Iterable[Field]) -> None:
+        """Compile the fields of the map"""
+        self.fields = {field.name: field for field in fields}
+        self.specs = {name: compile_field(field) for name, field in self.fields.items()}
+        self.poll_classes: dict[str, tuple[str, ...]] = {
+            poll: tuple(name for name, field in self.fields.items() if field.poll == poll)
+            for poll in POLL_CLASSES
+        }
+        self.publish_fields = tuple(name for name, field in self.fields.items() if field.poll)
+        self.deadbands: dict[str, tuple[float, float]] = {
+            name: (field.deadband, field.rel_deadband)
+            for name, field in self.fields.items()
+            if field.deadband or field.rel_deadband
+        }
+        self.enums: dict[str, tuple[str, ...]] = {
+            name: tuple(member.name for member in field.enum)
+            for name, field in self.fields.items()
+            if field.enum is not None
+        }
+        self._plans: dict[tuple[tuple[str, ...], int], ReadPlan] = {}
+
+    def poll_fields(self, polls: Iterable[str]) -> tuple[str, ...]:
+        """Return the fields of the given poll classes"""
+        return tuple(name for poll in polls for name in self.poll_classes[poll])
+
+    def plan(self, names: Iterable[str], max_gap: int) -> ReadPlan:
+        """Return the cached read plan for the named fields"""
+        key = (tuple(names), max_gap)
+        plan = self._plans.get(key)
+
+        if plan is None:
+            plan = self._plans[key] = ReadPlan((self.specs[name] for name in key[0]), max_gap)
+
+        return plan
+
+    def encode(self, name: str, value: Any) -> int:  # noqa: ANN401
+        """Convert a value of a writable field into its raw register value"""
+        field = self.fields[name]
+
+        if not field.writable:
+            msg = f"Field {name} is not writable"
+            raise ValueError(msg)
+
+        if field.enum is not None and isinstance(value, str):
+            value = field.enum[value]
+
+        if isinstance(value, Enum):
+            value = value.value
+
+        return round((value - field.offset) / field.scale)
@@ -0,0 +1,222 @@
+"""Asyncio Modbus client for reading and writing to the Modbus TCP server."""
+
+import logging
+import time
+
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.exceptions import ConnectionException, ModbusException
+
+from stats import STATS
+from stats.trace import TRACER
+
+from .breaker import CircuitBreaker
+from .decoder import PayloadDecoder
+from .encoder import PayloadEncoder
+from .planner import DEFAULT_MAX_GAP, RegisterBlock, RegisterSnapshot, plan_reads
+
+logger = logging.getLogger(__name__)
+
+# Exception codes a gateway answers with for a unit behind it that is down or unreachable
+GATEWAY_EXCEPTIONS = (0x0A, 0x0B)
+
+
+class AsyncModbusClient:
+    """Asyncio Modbus client"""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        ip: str,
+        port: int,
+        max_read_gap: int = DEFAULT_MAX_GAP,
+        *,
+        timeout: float = 2,
+        failure_threshold: int = 3,
+        max_backoff: float = 300,
+    ) -> None:
+        """Initialize the Modbus client
+
+        timeout bounds each request, failure_threshold consecutive failures mark a unit ID
+        as down until a probe succeeds, with probes backing off up to max_backoff seconds.
+        """
+        self.client = AsyncModbusTcpClient(ip, port=int(port), timeout=timeout, retries=0)
+        self.name = f"{ip}:{port}"
+        self.port = int(port)
+        self.connected = False
+        self.max_read_gap = max_read_gap
+        self.failure_threshold = failure_threshold
+        self.max_backoff = max_backoff
+        self.breakers: dict[int, CircuitBreaker] = {}
+        # Blocks a unit ID refused to serve in one request, read span by span instead
+        self.split_blocks: set[tuple[int, RegisterBlock]] = set()
+        self.decoder = PayloadDecoder
+        self.encoder = PayloadEncoder
+
+    async def connect(self) -> None:
+        """Connect to the Modbus server"""
+        self.connected = await self.client.connect()
+
+    def disconnect(self) -> None:
+        """Disconnect from the Modbus server"""
+        if not self.connected:
+            return
+
+        self.client.close()
+        self.connected = False
+
+    def breaker(self, device_id: int) -> CircuitBreaker:
+        """Return the circuit breaker of a unit ID"""
+        breaker = self.breakers.get(device_id)
+
+        if breaker is None:
+            breaker = self.breakers[device_id] = CircuitBreaker(
+                f"Device {device_id} on {self.name}",
+                failure_threshold=self.failure_threshold,
+                max_backoff=self.max_backoff,
+            )
+
+        return breaker
+
+    async def read_holding_registers(
+        self,
+        address: int,
+        count: int,
+        device_id: int,
+    ) -> list[int] | None:
+        """Read holding registers"""
+        breaker = self.breaker(device_id)
+        if not breaker.allow():
+            return None
+
+        started = time.perf_counter() if STATS.enabled else 0.0
+        try:
+            with TRACER.span("modbus.read", unit_id=device_id, address=address, count=count):
+                result = await self.client.read_holding_registers(
+                    address=address,
+                    count=count,
+                    device_id=device_id,
+                )
+        except ConnectionException as e:
+            if started:
+                STATS.inc(f"modbus.errors.{self.port}.{device_id}")
+            msg = f"Connection lost to {self.name} reading device {device_id}: {e}"
+            logger.warning(msg)
+            # The session is reconnected by the next poll cycle, the breaker counts the failure
+            self.connected = False
+            breaker.record_failure()
+            return None
+        except ModbusException as e:
+            if started:
+                STATS.inc(f"modbus.errors.{self.port}.{device_id}")
+            msg = f"No response from device {device_id} reading {address}+{count}: {e}"
+            logger.debug(msg)
+            breaker.record_failure()
+            return None
+
+        if started:
+            STATS.since(f"modbus.rtt.{self.port}.{device_id}", started)
+
+        if result.isError() and getattr(result, "exception_code", None) in GATEWAY_EXCEPTIONS:
+            msg = f"Gateway could not reach device {device_id}: {result}"
+            logger.debug(msg)
+            breaker.record_failure()
+            return None
+
+        # Any other exception response still means the device is alive
+        breaker.record_success()
+
+        if result.isError():
+            return None
+
+        return result.registers
+
+    def plan_reads(self, spans: list[tuple[int, int]]) -> tuple[RegisterBlock, ...]:
+        """Plan block reads for the given (address, count) spans"""
+        return plan_reads(spans, max_gap=self.max_read_gap)
+
+    async def read_blocks(
+        self,
+        blocks: tuple[RegisterBlock, ...],
+        device_id: int,
+    ) -> RegisterSnapshot:
+        """Read every block of a read plan and return the cached registers"""
+        results = []
+
+        for block in blocks:
+            if (device_id, block) not in self.split_blocks:
+                registers = await self.read_holding_registers(
+                    block.address,
+                    block.count,
+                    device_id,
+                )
+
+                # Only split the block up if the device answered with an exception response
+                if (
+                    registers is not None
+                    or len(block.spans) == 1
+                    or self.breaker(device_id).failures
+                ):
+                    results.append((block.address, registers))
+                    continue
+
+                # The gap between spans may contain registers the device refuses to serve, such
+                # a block is read span by span from now on
+                msg = f"Block read {block.address}+{block.count} failed for device {device_id}"
+                logger.debug(msg)
+                self.split_blocks.add((device_id, block))
+
+            for span in block.spans:
+                registers = await self.read_holding_registers(span.address, span.count, device_id)
+                results.append((span.address, registers))
+
+        return RegisterSnapshot(results)
+
+    async def read_str(self, address: int, length: int, device_id: int) -> str | None:
+        """Read string"""
+        count = (length + 1) // 2
+        result = await self.read_holding_registers(address, count, device_id)
+        return None if result is None else self.decoder.decode_str(result, length)
+
+    async def read_int16(self, address: int, device_id: int) -> int | None:
+        """Decode single register as signed 16-bit integer"""
+        result = await self.read_holding_registers(address, 1, device_id)
+        return None if result is None else self.decoder.decode_int16(result)
+
+    async def read_uint16(self, address: int, device_id: int) -> int | None:
+        """Decode single register as unsigned 16-bit integer"""
+        result = await self.read_holding_registers(address, 1, device_id)
+        return None if result is None else self.decoder.decode_uint16(result)
+
+    async def read_int32(self, address: int, device_id: int) -> int | None:
+        """Decode two registers as signed 32-bit integer"""
+        result = await self.read_holding_registers(address, 2, device_id)
+        return None if result is None else self.decoder.decode_int32(result)
+
+    async def read_uint32(self, address: int, device_id: int) -> int | None:
+        """Decode two registers as unsigned 32-bit integer"""
+        result = await self.read_holding_registers(address, 2, device_id)
+        return None if result is None else self.decoder.decode_uint32(result)
+
+    async def write_uint16(self, address: int, value: int, device_id: int) -> None:
+        """Write unsigned 16-bit integer"""
+        register = self.encoder.encode_uint16(value)
+        await self.client.write_register(address=address, value=register, device_id=device_id)
+
+    async def write_int16(self, address: int, value: int, device_id: int) -> None:
+        """Write signed 16-bit integer"""
+        register = self.encoder.encode_int16(value)
+        await self.client.write_register(address=address, value=register, device_id=device_id)
+
+    async def write_uint32(self, address: int, value: int, device_id: int) -> None:
+        """Write unsigned 32-bit integer"""
+        registers = self.encoder.encode_uint32(value)
+        await self.client.write_registers(address=address, values=registers, device_id=device_id)
+
+    async def write_int32(self, address: int, value: int, device_id: int) -> None:
+        """Write signed 32-bit integer"""
+        registers = self.encoder.encode_int32(value)
+        await self.client.write_registers(address=address, values=registers, device_id=device_id)
+
+    async def write_str(self, address: int, value: str, device_id: int) -> None:
+        """Write string"""
+        registers = self.encoder.encode_string(value, len(value))
+        await self.client.write_registers(address=address, values=registers, device_id=device_id)
@@ -0,0 +1,79 @@
+"""Circuit breaker for Modbus unit IDs"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures of a unit ID and stops requests to it while it is down
+
+    After failure_threshold consecutive failures the breaker opens and requests fail
+    immediately. Once the backoff has elapsed a single probe request is let through; success
+    closes the breaker, failure reopens it with the backoff doubled up to max_backoff.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        backoff: float = 5,
+        max_backoff: float = 300,
+    ) -> None:
+        """Initialize a closed breaker"""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = backoff
+        self.retry_at = 0.0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        if self.state == CLOSED:
+            return True
+
+        if self.state == OPEN and time.monotonic() >= self.retry_at:
+            self.state = HALF_OPEN
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        """Record a request that got a response"""
+        if self.state != CLOSED:
+            msg = f"{self.name} is responding again, closing circuit"
+            logger.info(msg)
+
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = self.base_backoff
+
+    def record_failure(self) -> None:
+        """Record a request that got no response"""
+        self.failures += 1
+
+        if self.state == HALF_OPEN:
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+        elif self.state == OPEN or self.failures < self.failure_threshold:
+            return
+
+        self.state = OPEN
+        self.retry_at = time.monotonic() + self.backoff
+        msg = f"{self.name} is down after {self.failures} failures, retrying in {self.backoff}s"
+        logger.warning(msg)
+
+    def as_dict(self) -> dict[str, str | int | float]:
+        """Return the breaker state for monitoring"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": max(0.0, self.retry_at - time.monotonic()) if self.state == OPEN else 0.0,
+        }
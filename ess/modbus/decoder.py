@@ -1,6 +1,15 @@
 """Payload decoder"""
 
 import struct
+import sys
+from array import array
+from collections.abc import Iterable
+
+_INT16 = struct.Struct(">h")
+_UINT16 = struct.Struct(">H")
+_INT32 = struct.Struct(">l")
+_UINT32 = struct.Struct(">L")
+_REGISTER_PAIR = struct.Struct(">HH")
 
 
 class PayloadDecoder:
@@ -11,16 +20,13 @@ class PayloadDecoder:
     @classmethod
     def decode_str(cls, registers: list[int], length: int = 32) -> str:
         """Decode string"""
-        byte_data = bytearray()
-        for reg in registers:
-            byte_data.extend(reg.to_bytes(2, "big"))
-
-        return byte_data[:length].decode("utf-8").rstrip("\x00")
+        byte_data = cls.to_buffer(registers)
+        return bytes(byte_data[:length]).decode("utf-8").rstrip("\x00")
 
     @classmethod
     def decode_int16(cls, registers: list[int]) -> int:
         """Decode single register as signed 16-bit integer"""
-        return struct.unpack(f"{cls.endian}h", struct.pack(f"{cls.endian}H", registers[0]))[0]
+        return _INT16.unpack(_UINT16.pack(registers[0]))[0]
 
     @classmethod
     def decode_uint16(cls, registers: list[int]) -> int:
@@ -30,11 +36,60 @@ class PayloadDecoder:
     @classmethod
     def decode_int32(cls, registers: list[int]) -> int:
         """Decode two registers as signed 32-bit integer"""
-        combined = struct.pack(f"{cls.endian}HH", *registers)
-        return struct.unpack(f"{cls.endian}l", combined)[0]
+        return _INT32.unpack(_REGISTER_PAIR.pack(registers[0], registers[1]))[0]
 
     @classmethod
     def decode_uint32(cls, registers: list[int]) -> int:
         """Decode two registers as unsigned 32-bit integer"""
-        combined = struct.pack(f"{cls.endian}HH", *registers)
-        return struct.unpack(f"{cls.endian}L", combined)[0]
+        return (registers[0] << 16) | registers[1]
+
+    @classmethod
+    def to_buffer(cls, registers: list[int] | array | bytes | memoryview) -> bytes | memoryview:
+        """Return registers as a big endian buffer
+
+        Lists and native order array('H') blocks are converted, bytes and memoryviews are
+        assumed to already hold the registers as received on the wire.
+        """
+        if isinstance(registers, bytes | bytearray | memoryview):
+            return registers
+
+        if isinstance(registers, array):
+            if sys.byteorder == "little":
+                registers = array("H", registers)
+                registers.byteswap()
+            return registers.tobytes()
+
+        return struct.pack(f">{len(registers)}H", *registers)
+
+    @classmethod
+    def compile_layout(cls, fields: Iterable[tuple[int, str]]) -> struct.Struct:
+        """Compile (register offset, struct format) fields into a single block layout
+
+        Fields must be ordered by offset and must not overlap, unused registers between
+        fields are skipped with pad bytes.
+        """
+        layout = [cls.endian]
+        position = 0
+
+        for offset, fmt in fields:
+            start = offset * 2
+            if start < position:
+                msg = f"Field {fmt} at register offset {offset} overlaps the previous field"
+                raise ValueError(msg)
+
+            if start > position:
+                layout.append(f"{start - position}x")
+
+            layout.append(fmt)
+            position = start + struct.calcsize(f"{cls.endian}{fmt}")
+
+        return struct.Struct("".join(layout))
+
+    @classmethod
+    def decode_block(
+        cls,
+        registers: list[int] | array | bytes | memoryview,
+        layout: struct.Struct,
+    ) -> tuple:
+        """Decode every field of a compiled layout from a block of registers"""
+        return layout.unpack_from(cls.to_buffer(registers))
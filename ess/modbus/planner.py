@@ -0,0 +1,93 @@
+"""Read planner for coalescing register reads into block reads"""
+
+import struct
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from .decoder import PayloadDecoder
+
+# Modbus limits a single read holding registers request to 125 registers
+MAX_READ_COUNT = 125
+DEFAULT_MAX_GAP = 16
+
+
+class RegisterSpan(NamedTuple):
+    """Registers needed by a single value"""
+
+    address: int
+    count: int
+
+
+class RegisterBlock(NamedTuple):
+    """Contiguous registers fetched with a single request"""
+
+    address: int
+    count: int
+    spans: tuple[RegisterSpan, ...]
+
+
+def plan_reads(
+    spans: Iterable[tuple[int, int]],
+    max_gap: int = DEFAULT_MAX_GAP,
+    max_count: int = MAX_READ_COUNT,
+) -> tuple[RegisterBlock, ...]:
+    """Merge register spans into the fewest block reads
+
+    Spans separated by at most max_gap unused registers are read together as long as the
+    resulting block stays within max_count registers.
+    """
+    blocks: list[tuple[int, int, list[RegisterSpan]]] = []
+
+    for address, count in sorted(set(spans)):
+        if not 0 < count <= max_count:
+            msg = f"Register count {count} at {address} must be between 1 and {max_count}"
+            raise ValueError(msg)
+
+        span = RegisterSpan(address, count)
+
+        if blocks:
+            start, end, block_spans = blocks[-1]
+            new_end = max(end, address + count)
+            if address - end <= max_gap and new_end - start <= max_count:
+                block_spans.append(span)
+                blocks[-1] = (start, new_end, block_spans)
+                continue
+
+        blocks.append((address, address + count, [span]))
+
+    return tuple(
+        RegisterBlock(address=start, count=end - start, spans=tuple(block_spans))
+        for start, end, block_spans in blocks
+    )
+
+
+class RegisterSnapshot:
+    """Registers of a single device served from previously read blocks"""
+
+    def __init__(self, blocks: Iterable[tuple[int, list[int] | None]]) -> None:
+        """Initialize the snapshot from (address, registers) pairs, None for failed reads"""
+        blocks = list(blocks)
+        self.buffers = {
+            address: PayloadDecoder.to_buffer(registers)
+            for address, registers in blocks
+            if registers
+        }
+        self.complete = all(registers for _address, registers in blocks)
+
+    def locate(self, address: int, count: int) -> tuple[bytes, int] | None:
+        """Return the buffer and byte offset holding count registers at address"""
+        for start, buffer in self.buffers.items():
+            offset = (address - start) * 2
+            if offset >= 0 and offset + count * 2 <= len(buffer):
+                return buffer, offset
+
+        return None
+
+    def read_holding_registers(self, address: int, count: int, device_id: int) -> list[int] | None:  # noqa: ARG002
+        """Read holding registers from the cached blocks"""
+        located = self.locate(address, count)
+
+        if located is None:
+            return None
+
+        return list(struct.unpack_from(f">{count}H", *located))
@@ -0,0 +1,129 @@
+"""Fixed-rate scheduler for poll cycles"""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerStats:
+    """Timing statistics of a fixed-rate scheduler"""
+
+    def __init__(self) -> None:
+        """Initialize empty statistics"""
+        self.ticks = 0
+        self.missed = 0
+        self.overruns = 0
+        self.jitter_last = 0.0
+        self.jitter_max = 0.0
+        self.jitter_total = 0.0
+        self.duration_last = 0.0
+        self.duration_max = 0.0
+        self.duration_total = 0.0
+
+    def record(self, jitter: float, duration: float) -> None:
+        """Record the start jitter and duration of a cycle"""
+        self.ticks += 1
+        self.jitter_last = jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+        self.jitter_total += jitter
+        self.duration_last = duration
+        self.duration_max = max(self.duration_max, duration)
+        self.duration_total += duration
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the statistics as a flat dict"""
+        ticks = self.ticks or 1
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "overruns": self.overruns,
+            "jitter_last": self.jitter_last,
+            "jitter_max": self.jitter_max,
+            "jitter_mean": self.jitter_total / ticks,
+            "duration_last": self.duration_last,
+            "duration_max": self.duration_max,
+            "duration_mean": self.duration_total / ticks,
+        }
+
+
+class FixedRateScheduler:
+    """Runs a cycle at absolute, evenly spaced tick times
+
+    Ticks are computed from the start time rather than from the end of the previous cycle so
+    the period does not drift. Ticks that have already passed when a cycle finishes are
+    skipped and counted instead of being run back to back. A cycle running longer than the
+    deadline is cancelled and counted as an overrun, without a deadline a cycle is never
+    cancelled and is counted as an overrun when it runs longer than the interval.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        deadline: float | None = None,
+        report_interval: float = 300,
+    ) -> None:
+        """Initialize the scheduler"""
+        self.interval = interval
+        self.deadline = deadline
+        self.report_every = max(1, round(report_interval / interval))
+        self.stats = SchedulerStats()
+        self.running = False
+        self._stopped = asyncio.Event()
+
+    async def _sleep_until(self, tick: float) -> None:
+        """Sleep until the tick time or until the scheduler is stopped"""
+        delay = tick - asyncio.get_running_loop().time()
+
+        if delay > 0:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._stopped.wait(), timeout=delay)
+
+    async def run(self, cycle: Callable[[], Awaitable[None]]) -> None:
+        """Run cycle on every tick until stopped"""
+        loop = asyncio.get_running_loop()
+        self.running = True
+        self._stopped.clear()
+        next_tick = loop.time()
+
+        while self.running:
+            await self._sleep_until(next_tick)
+            if not self.running:
+                break
+
+            started = loop.time()
+            try:
+                async with asyncio.timeout(self.deadline):
+                    await cycle()
+            except TimeoutError:
+                self.stats.overruns += 1
+                msg = f"Poll cycle exceeded its {self.deadline}s deadline"
+                logger.warning(msg)
+
+            finished = loop.time()
+            self.stats.record(started - next_tick, finished - started)
+            if self.deadline is None and finished - started > self.interval:
+                self.stats.overruns += 1
+
+            next_tick += self.interval
+            if finished > next_tick:
+                missed = int((finished - next_tick) // self.interval) + 1
+                self.stats.missed += missed
+                next_tick += missed * self.interval
+
+            if self.stats.ticks % self.report_every == 0:
+                stats = self.stats.as_dict()
+                msg = (
+                    f"Poll scheduler: {stats['ticks']} ticks, {stats['missed']} missed, "
+                    f"{stats['overruns']} overruns, jitter mean {stats['jitter_mean']:.3f}s "
+                    f"max {stats['jitter_max']:.3f}s, duration mean {stats['duration_mean']:.3f}s "
+                    f"max {stats['duration_max']:.3f}s"
+                )
+                logger.info(msg)
+
+    def stop(self) -> None:
+        """Stop the scheduler, waking it if it is waiting for the next tick"""
+        self.running = False
+        self._stopped.set()
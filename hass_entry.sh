@@ -6,15 +6,39 @@ export MQTT_PORT=$(bashio::config 'mqtt_port' $(bashio::services mqtt "port" " "
 export MQTT_USER=$(bashio::config 'mqtt_username' $(bashio::services mqtt "username" " "))
 export MQTT_PASSWORD=$(bashio::config 'mqtt_password' $(bashio::services mqtt "password" " "))
 export MQTT_TOPIC=$(bashio::config 'mqtt_topic')
+export MQTT_PUBLISH_MODE=$(bashio::config 'mqtt_publish_mode')
 
 export PVS_HOST=$(bashio::config 'pvs_host')
 export PVS_WS_PORT=$(bashio::config 'pvs_ws_port')
 export PVS_WS_SECURE=$(bashio::config 'pvs_ws_secure')
+export PVS_DETAIL_INTERVAL=$(bashio::config 'pvs_detail_interval')
 
 export ESS_HOST=$(bashio::config 'ess_host')
 export ESS_PORT=$(bashio::config 'ess_port')
 export ESS_PORT_503=$(bashio::config 'ess_port_503')
 export ESS_DEVICES=$(bashio::config 'ess_devices')
+export ESS_POLL_INTERVAL=$(bashio::config 'ess_poll_interval')
+
+# Unset deadlines and timeouts keep the recorder's defaults
+if bashio::config.has_value 'ess_poll_deadline'; then
+  export ESS_POLL_DEADLINE=$(bashio::config 'ess_poll_deadline')
+fi
+if bashio::config.has_value 'ess_device_budget'; then
+  export ESS_DEVICE_BUDGET=$(bashio::config 'ess_device_budget')
+fi
+if bashio::config.has_value 'ess_request_timeout'; then
+  export ESS_REQUEST_TIMEOUT=$(bashio::config 'ess_request_timeout')
+fi
+
+export MQTT_SPILL_DIR=/data/mqtt_buffer
+export STORE_PATH=/data/metrics.db
+export PVS_DETAIL_CACHE=/data/devicelist.json
+
+# The HTTP API has no authentication, so it is only served when enabled
+if bashio::config.true 'api_enabled'; then
+  export API_HOST=$(bashio::config 'api_host')
+  export API_PORT=8080
+fi
 
 
 # Transform newline-separated JSON objects into a JSON array and save to file
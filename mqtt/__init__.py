@@ -3,8 +3,16 @@
 import asyncio
 import logging
 import sys
+import time
 
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+from stats import STATS, timed
+from stats.trace import TRACER
+
+from .buffer import BufferedMessage, OfflineBuffer
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -14,8 +22,27 @@ logger.propagate = True
 class MqttClient:
     """A class for creating instances of a Mqtt Client"""
 
-    def __init__(self, host, topic, username, password, port=1883) -> None:
-        """Returns an instance of MqttClient"""
+    def __init__(  # noqa: PLR0913
+        self,
+        host,
+        topic,
+        username,
+        password,
+        port=1883,
+        *,
+        buffer_size: int = 10000,
+        spill_dir: str | None = None,
+        max_spill_bytes: int = 10 * 1024 * 1024,
+        drain_rate: int = 50,
+    ) -> None:
+        """Returns an instance of MqttClient
+
+        Messages published while the broker is unreachable are kept in an offline buffer of
+        buffer_size messages, spilling up to max_spill_bytes to spill_dir when set, and are
+        replayed in order at up to drain_rate messages per second once reconnected. Replayed
+        messages carry their capture time as MQTT 5 user properties, so consumers can tell
+        them from live readings.
+        """
         self.host = host
         self.port = port
         self.topic = topic
@@ -24,6 +51,13 @@ class MqttClient:
         self.is_running = False
         self.client = None
         self.connected = False
+        self.buffer = OfflineBuffer(
+            max_messages=buffer_size,
+            spill_dir=spill_dir,
+            max_disk_bytes=max_spill_bytes,
+        )
+        self.drain_rate = drain_rate
+        STATS.gauge("mqtt.backlog", lambda: len(self.buffer))
 
     def _on_connect(self, *_args: any, **_kwargs) -> None:
         logger.info("Connected to MQTT Broker")
@@ -42,19 +76,32 @@ class MqttClient:
 
         while self.is_running:
             if self.client and self.connected:
+                self._drain()
                 await asyncio.sleep(1)
                 continue
 
+            if self.client is not None:
+                self.client.loop_stop()
+
             logger.info("Connecting to MQTT Broker...")
-            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, protocol=mqtt.MQTTv5)
             if self.username is not None:
                 self.client.username_pw_set(self.username, self.password)
-            self.client.connect(host=self.host, port=self.port)
+            try:
+                self.client.connect(host=self.host, port=self.port)
+            except OSError as e:
+                # Keep buffering until the broker is reachable again
+                msg = f"Could not connect to MQTT Broker: {e}"
+                logger.warning(msg)
+                self.client = None
+                await asyncio.sleep(5)
+                continue
             self.client.on_connect = self._on_connect
             self.client.on_disconnect = self._on_disconnect
             self.client.loop_start()
             await asyncio.sleep(1)
 
+    @timed("mqtt.publish")
     def publish(
         self,
         message: str,
@@ -64,17 +111,92 @@ class MqttClient:
     ) -> None:
         """Publish a message"""
         publish_topic = f"{self.topic}/{topic}" if topic is not None else self.topic
+        buffered = BufferedMessage(time.time(), publish_topic, message, qos, retain)
+
+        # Queue behind any backlog so messages reach the broker in order
+        with TRACER.span("mqtt.publish", topic=publish_topic):
+            if self.buffer or not self._send(buffered):
+                self._buffer(buffered)
+                if STATS.enabled:
+                    STATS.inc("mqtt.buffered")
+            elif STATS.enabled:
+                STATS.inc("mqtt.sent")
+
+    def _send(self, message: BufferedMessage, *, replayed: bool = False) -> bool:
+        """Publish a message, returning whether the client accepted it
+
+        A replayed message is tagged with the epoch time it was captured at.
+        """
+        if not self.connected:
+            return False
+
+        properties = None
+        if replayed:
+            properties = Properties(PacketTypes.PUBLISH)
+            properties.UserProperty = [
+                ("timestamp", f"{message.timestamp:.3f}"),
+                ("replayed", "true"),
+            ]
 
-        if self.connected:
-            self.client.publish(publish_topic, message, qos=qos, retain=retain)
-        else:
-            logger.error("Could not publish due to MQTT being disconnected")
+        info = self.client.publish(
+            message.topic,
+            message.payload,
+            qos=message.qos,
+            retain=message.retain,
+            properties=properties,
+        )
+        return info.rc == mqtt.MQTT_ERR_SUCCESS
+
+    def _buffer(self, message: BufferedMessage) -> None:
+        """Keep a message for replay once the broker is reachable"""
+        dropped = self.buffer.dropped
+        self.buffer.append(message)
+
+        if len(self.buffer) == 1:
+            logger.warning("MQTT is disconnected, buffering messages")
+
+        if self.buffer.dropped > dropped and self.buffer.dropped % 1000 == 1:
+            msg = f"MQTT offline buffer is full, dropped {self.buffer.dropped} oldest messages"
+            logger.warning(msg)
+
+    def _drain(self) -> None:
+        """Replay up to drain_rate buffered messages"""
+        if not self.buffer:
+            return
+
+        sent = 0
+        oldest = None
+
+        while sent < self.drain_rate:
+            message = self.buffer.pop()
+            if message is None:
+                break
+
+            if not self._send(message, replayed=True):
+                # Lost the connection again, keep the message at the front of the queue
+                self.buffer.requeue(message)
+                break
+
+            oldest = oldest or message.timestamp
+            sent += 1
+
+        if sent:
+            msg = (
+                f"Replayed {sent} buffered MQTT messages from up to "
+                f"{time.time() - oldest:.0f}s ago, {len(self.buffer)} remaining"
+            )
+            logger.info(msg)
 
     async def stop(self) -> None:
-        """Disconnect and stop the client"""
+        """Disconnect and stop the client, spilling the unsent backlog to disk"""
         self.is_running = False
 
         if self.client and self.connected:
             self.client.publish(topic=f"{self.topic}/status", payload="offline", qos=2, retain=True)
             self.client.disconnect()
             self.client.loop_stop()
+
+        if self.buffer:
+            self.buffer.flush()
+            msg = f"Kept {len(self.buffer)} unsent MQTT messages for the next run"
+            logger.info(msg)
@@ -0,0 +1,157 @@
+"""Bounded offline buffer for MQTT messages"""
+
+import json
+import logging
+from collections import deque
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedMessage(NamedTuple):
+    """A message that could not be published"""
+
+    timestamp: float
+    topic: str
+    payload: str | int | float | None
+    qos: int
+    retain: bool
+
+
+class OfflineBuffer:
+    """Ring buffer of unsent messages with optional spill to disk
+
+    Up to max_messages are kept in memory. When spill_dir is set, messages pushed out of the
+    memory ring are appended to segment files there instead of being dropped, and segments
+    left by a previous run are replayed first. flush spills whatever is still in memory, so a
+    restart while offline loses nothing. Disk usage is capped at max_disk_bytes by
+    deleting the oldest segment, so the oldest messages are always the ones dropped.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = 10000,
+        spill_dir: str | None = None,
+        max_disk_bytes: int = 10 * 1024 * 1024,
+        segment_bytes: int = 256 * 1024,
+    ) -> None:
+        """Initialize the buffer, picking up segments spilled by a previous run"""
+        self.memory: deque[BufferedMessage] = deque()
+        self.max_messages = max_messages
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self.segment_bytes = segment_bytes
+        self.dropped = 0
+
+        # Segment path to (message count, size in bytes), oldest first
+        self.segments: dict[Path, tuple[int, int]] = {}
+        self.disk_messages = 0
+        self.disk_bytes = 0
+        self.replay: deque[BufferedMessage] = deque()
+        self.next_segment = 0
+
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            # Segments are numbered in replay order, the numbers can be negative after a flush
+            for path in sorted(self.spill_dir.glob("*.jsonl"), key=lambda path: int(path.stem)):
+                with path.open("rb") as file:
+                    count = sum(1 for _ in file)
+                self._add_segment(path, count, path.stat().st_size)
+                self.next_segment = int(path.stem) + 1
+
+            if self.disk_messages:
+                msg = f"Found {self.disk_messages} spilled MQTT messages from a previous run"
+                logger.info(msg)
+
+    def __len__(self) -> int:
+        """Number of buffered messages"""
+        return len(self.replay) + self.disk_messages + len(self.memory)
+
+    def _add_segment(self, path: Path, count: int, size: int) -> None:
+        """Account for a segment"""
+        self.segments[path] = (count, size)
+        self.disk_messages += count
+        self.disk_bytes += size
+
+    def _remove_segment(self, path: Path) -> int:
+        """Delete a segment and return the number of messages it held"""
+        count, size = self.segments.pop(path)
+        self.disk_messages -= count
+        self.disk_bytes -= size
+        path.unlink(missing_ok=True)
+        return count
+
+    def _spill(self, message: BufferedMessage) -> None:
+        """Append a message to the newest segment"""
+        line = json.dumps(message).encode() + b"\n"
+        path = next(reversed(self.segments), None)
+
+        if path is None or self.segments[path][1] + len(line) > self.segment_bytes:
+            path = self.spill_dir / f"{self.next_segment:012d}.jsonl"
+            self.next_segment += 1
+            self.segments[path] = (0, 0)
+
+        with path.open("ab") as file:
+            file.write(line)
+
+        count, size = self.segments[path]
+        self.segments[path] = (count + 1, size + len(line))
+        self.disk_messages += 1
+        self.disk_bytes += len(line)
+
+        while self.disk_bytes > self.max_disk_bytes and len(self.segments) > 1:
+            self.dropped += self._remove_segment(next(iter(self.segments)))
+
+    def append(self, message: BufferedMessage) -> None:
+        """Buffer a message, spilling or dropping the oldest one when memory is full"""
+        if len(self.memory) >= self.max_messages:
+            oldest = self.memory.popleft()
+            if self.spill_dir is not None:
+                self._spill(oldest)
+            else:
+                self.dropped += 1
+
+        self.memory.append(message)
+
+    def flush(self) -> None:
+        """Spill every message held in memory to disk, keeping the replay order"""
+        if self.spill_dir is None:
+            return
+
+        if self.replay:
+            # Messages taken from the oldest segment go back in front of the other segments
+            first = min((int(path.stem) for path in self.segments), default=self.next_segment)
+            path = self.spill_dir / f"{first - 1:012d}.jsonl"
+            data = b"".join(json.dumps(message).encode() + b"\n" for message in self.replay)
+            path.write_bytes(data)
+            self.segments = {path: (0, 0), **self.segments}
+            self._add_segment(path, len(self.replay), len(data))
+            self.replay.clear()
+
+        while self.memory:
+            self._spill(self.memory.popleft())
+
+    def requeue(self, message: BufferedMessage) -> None:
+        """Put a message that failed to send back at the front of the buffer"""
+        self.replay.appendleft(message)
+
+    def pop(self) -> BufferedMessage | None:
+        """Remove and return the oldest buffered message"""
+        if not self.replay and self.segments:
+            path = next(iter(self.segments))
+            try:
+                with path.open("r") as file:
+                    self.replay.extend(BufferedMessage(*json.loads(line)) for line in file)
+            except (OSError, ValueError, TypeError):
+                msg = f"Discarding unreadable MQTT spill segment {path}"
+                logger.exception(msg)
+            self._remove_segment(path)
+
+        if self.replay:
+            return self.replay.popleft()
+
+        if self.memory:
+            return self.memory.popleft()
+
+        return None
@@ -1,8 +1,12 @@
 """Base module for PVS"""
 
+from pvs.pvs_detail import PVSDetail
+from pvs.pvs_detail_poller import PVSDetailPoller
 from pvs.pvs_websocket import PVSWebSocket
 
 __all__ = [
+    "PVSDetail",
+    "PVSDetailPoller",
     "PVSWebSocket",
 ]
 
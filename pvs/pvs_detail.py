@@ -1,10 +1,28 @@
 """Module for retrieving PVS details from the PVS Supervisor"""
 
+import asyncio
+import contextlib
 import json
+import logging
+import os
+import time
 from pathlib import Path
 
 import httpx
-from pydantic import BaseModel, computed_field
+from pydantic import BaseModel, TypeAdapter, ValidationError, computed_field
+
+from pvs.pvs_fleet import OUTLIER_THRESHOLD, PanelFleet
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached DeviceList is served as is before a refresh is started in the background
+CACHE_MAX_AGE = 60
+
+# The validated path builds the full pydantic model of every device, the lean path only
+# converts the keys SolarPanel needs
+PARSE_VALIDATED = "validated"
+PARSE_LEAN = "lean"
+PARSE_MODES = (PARSE_VALIDATED, PARSE_LEAN)
 
 
 class PVSMeter(BaseModel):
@@ -101,22 +119,210 @@ class SolarPanel(BaseModel):
     energy: float
 
 
+# Built once, a TypeAdapter validates a whole list in a single call into pydantic-core
+METERS_ADAPTER = TypeAdapter(list[PVSMeter])
+SOLAR_INVERTERS_ADAPTER = TypeAdapter(list[PVSSolarInverter])
+SOLAR_PANELS_ADAPTER = TypeAdapter(list[SolarPanel])
+
+
+def is_meter(device: dict) -> bool:
+    """Whether a DeviceList entry is a power meter"""
+    return device.get("DEVICE_TYPE") == "Power Meter"
+
+
+def is_solar_inverter(device: dict) -> bool:
+    """Whether a DeviceList entry is a panel microinverter"""
+    return device.get("DEVICE_TYPE") == "Inverter" and device.get("TYPE") == "SOLARBRIDGE"
+
+
+def solar_panel_fields(device: dict) -> dict:
+    """Pick the SolarPanel fields out of a DeviceList entry, ignoring the rest of it"""
+    try:
+        return {
+            "serial": device["SERIAL"],
+            "model": device["MODEL"],
+            "description": device["DESCR"],
+            "power": float(device["p_mppt1_kw"]) * 1000,
+            "voltage": device["v_mppt1_v"],
+            "current": device["i_mppt1_a"],
+            "energy": device["ltea_3phsum_kwh"],
+        }
+    except (KeyError, TypeError) as e:
+        msg = f"Invalid solar inverter {device.get('SERIAL')}: {e!r}"
+        raise ValueError(msg) from e
+
+
+def valid_solar_inverters(devices: list[dict]) -> list[dict]:
+    """Drop the inverter entries that do not validate against PVSSolarInverter, logging them"""
+    try:
+        SOLAR_INVERTERS_ADAPTER.validate_python(devices)
+    except ValidationError as e:
+        invalid = {}
+        for error in e.errors():
+            if error["loc"]:
+                invalid.setdefault(error["loc"][0], f"{error['loc'][1:]} {error['msg']}")
+        for index, reason in invalid.items():
+            msg = f"Skipping invalid solar inverter {devices[index].get('SERIAL')}: {reason}"
+            logger.warning(msg)
+        return [device for index, device in enumerate(devices) if index not in invalid]
+
+    return devices
+
+
 class PVSDetail:
     """Class for retrieving PVS details from the PVS Supervisor"""
 
-    def __init__(self, host: str, port: int = 80) -> None:
-        """Initialize the PVS_Detail class"""
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str,
+        port: int = 80,
+        timeout: float = 30,
+        parse_mode: str = PARSE_VALIDATED,
+        outlier_threshold: float = OUTLIER_THRESHOLD,
+        *,
+        cache_path: str | None = None,
+        max_age: float = CACHE_MAX_AGE,
+    ) -> None:
+        """Initialize the PVS_Detail class
+
+        parse_mode selects whether devices are validated against their full models or only
+        the fields that are used are extracted. Panels producing outlier_threshold below the
+        fleet median power are flagged by update_fleet. The last good DeviceList is kept in
+        cache_path, when given, and served by get_device_list until it is max_age seconds old.
+        """
+        if parse_mode not in PARSE_MODES:
+            msg = f"Unknown parse mode {parse_mode}, expected one of {PARSE_MODES}"
+            raise ValueError(msg)
+
         self.host = host
         self.port = port
+        self.timeout = timeout
+        self.parse_mode = parse_mode
         self.pvs_detail_raw = None
+        self.async_client: httpx.AsyncClient | None = None
+        self.fleet = PanelFleet(outlier_threshold)
+        # DATATIME of the readings last parsed per SERIAL, to skip devices that were not refreshed
+        self.datatimes: dict[str, str] = {}
 
         self.url = f"http://{self.host}:{self.port}/cgi-bin/dl_cgi?Command=DeviceList"
 
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.max_age = max_age
+        self.content: bytes | None = None
+        self.fetched = 0.0
+        self._refresh: asyncio.Task | None = None
+        self._load_cache()
+
     def get_pvs_detail(self) -> dict:
         """Get the PVS detail"""
-        response = httpx.get(self.url, timeout=30)
+        response = httpx.get(self.url, timeout=self.timeout)
         self.pvs_detail_raw = response.json()
 
+    async def fetch_pvs_detail(self) -> dict:
+        """Get a fresh PVS detail, sharing a fetch that is already running"""
+        await self.refresh()
+        return self.pvs_detail_raw
+
+    @property
+    def age(self) -> float:
+        """Seconds since the cached DeviceList was fetched"""
+        return time.time() - self.fetched
+
+    async def get_device_list(self) -> bytes:
+        """Return the cached DeviceList response, refreshing it in the background when stale
+
+        Only a cold cache waits for the PVS.
+        """
+        if self.content is None:
+            await self.refresh()
+        elif self.age >= self.max_age and (self._refresh is None or self._refresh.done()):
+            self._start_refresh().add_done_callback(self._log_refresh_error)
+
+        return self.content
+
+    async def refresh(self) -> None:
+        """Fetch the DeviceList, joining the fetch already running if there is one"""
+        task = self._refresh
+        if task is None or task.done():
+            task = self._start_refresh()
+
+        # A waiter being cancelled must not cancel the fetch the others are waiting on
+        await asyncio.shield(task)
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Start a fetch of the DeviceList"""
+        self._refresh = asyncio.create_task(self._fetch())
+        return self._refresh
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        """Log why a background refresh failed, the stale DeviceList stays cached"""
+        if not task.cancelled() and task.exception() is not None:
+            msg = f"Could not refresh the PVS DeviceList: {task.exception()}"
+            logger.warning(msg)
+
+    async def _fetch(self) -> None:
+        """Fetch the DeviceList over a keep-alive connection without blocking the event loop
+
+        The response is parsed and persisted in a worker thread since a DeviceList can be large.
+        """
+        if self.async_client is None:
+            self.async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+            )
+
+        started = time.time()
+        response = await self.async_client.get(self.url)
+        response.raise_for_status()
+        self.pvs_detail_raw = await asyncio.to_thread(json.loads, response.content)
+        self.content = response.content
+        self.fetched = started
+
+        if self.cache_path is not None:
+            await asyncio.to_thread(self._save_cache)
+
+    def _load_cache(self) -> None:
+        """Warm the cache from cache_path, dated by its modification time"""
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+
+        try:
+            content = self.cache_path.read_bytes()
+            self.pvs_detail_raw = json.loads(content)
+            self.fetched = self.cache_path.stat().st_mtime
+        except (OSError, ValueError) as e:
+            msg = f"Ignoring the cached PVS DeviceList in {self.cache_path}: {e}"
+            logger.warning(msg)
+            return
+
+        self.content = content
+        msg = f"Loaded the PVS DeviceList cached {self.age:.0f}s ago from {self.cache_path}"
+        logger.info(msg)
+
+    def _save_cache(self) -> None:
+        """Replace cache_path with the cached DeviceList, dated by its fetch time"""
+        temp_path = self.cache_path.with_name(f"{self.cache_path.name}.tmp")
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_bytes(self.content)
+            os.utime(temp_path, (self.fetched, self.fetched))
+            temp_path.replace(self.cache_path)
+        except OSError as e:
+            msg = f"Could not save the PVS DeviceList to {self.cache_path}: {e}"
+            logger.warning(msg)
+
+    async def aclose(self) -> None:
+        """Stop a running refresh and close the keep-alive connection"""
+        if self._refresh is not None and not self._refresh.done():
+            self._refresh.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._refresh
+
+        if self.async_client is not None:
+            await self.async_client.aclose()
+            self.async_client = None
+
     def load_file(self, file_path: str) -> dict:
         """Load the file"""
         with Path(file_path).open("r") as file:
@@ -127,22 +333,36 @@ class PVSDetail:
         with Path(file_path).open("w") as file:
             json.dump(self.pvs_detail_raw, file, indent=4)
 
-    def get_meters(self) -> list[PVSMeter]:
-        """Get the meters"""
+    def changed_devices(self, devices: list[dict]) -> list[dict]:
+        """Entries whose DATATIME differs from the one last parsed for their SERIAL"""
+        datatimes = self.datatimes
         return [
-            PVSMeter(**device)
-            for device in self.pvs_detail_raw.get("devices", [])
-            if device.get("DEVICE_TYPE") == "Power Meter"
+            device
+            for device in devices
+            if "DATATIME" not in device or datatimes.get(device.get("SERIAL")) != device["DATATIME"]
         ]
 
+    def mark_parsed(self, devices: list[dict]) -> None:
+        """Remember the DATATIME of entries whose readings were parsed"""
+        self.datatimes.update((device.get("SERIAL"), device.get("DATATIME")) for device in devices)
+
+    def get_meters(self) -> list[PVSMeter]:
+        """Get the meters"""
+        meters = [device for device in self.pvs_detail_raw.get("devices", []) if is_meter(device)]
+
+        return METERS_ADAPTER.validate_python(meters)
+
     def get_solar_inverters(self) -> list[SolarPanel]:
         """Get the solar inverters"""
-        solar_inverters = [
-            PVSSolarInverter(**device)
-            for device in self.pvs_detail_raw.get("devices", [])
-            if device.get("DEVICE_TYPE") == "Inverter" and device.get("TYPE") == "SOLARBRIDGE"
+        devices = [
+            device for device in self.pvs_detail_raw.get("devices", []) if is_solar_inverter(device)
         ]
 
+        if self.parse_mode == PARSE_LEAN:
+            return SOLAR_PANELS_ADAPTER.validate_python(list(map(solar_panel_fields, devices)))
+
+        solar_inverters = SOLAR_INVERTERS_ADAPTER.validate_python(devices)
+
         return [
             SolarPanel(
                 serial=solar_inverter.SERIAL,
@@ -155,3 +375,27 @@ class PVSDetail:
             )
             for solar_inverter in solar_inverters
         ]
+
+    def update_fleet(self) -> PanelFleet:
+        """Write the solar inverters into the columns of fleet and update its statistics
+
+        Only inverters whose DATATIME advanced since the last update are parsed, the PVS only
+        refreshes them every few minutes. fleet.changed flags their slots. Invalid entries are
+        parsed again by the next update and their panels are left out of the statistics.
+        """
+        devices = [
+            device for device in self.pvs_detail_raw.get("devices", []) if is_solar_inverter(device)
+        ]
+        changed = self.changed_devices(devices)
+
+        valid = changed
+        if changed and self.parse_mode == PARSE_VALIDATED:
+            valid = valid_solar_inverters(changed)
+
+        invalid = {device.get("SERIAL") for device in changed}
+        invalid -= {device.get("SERIAL") for device in valid}
+        seen = [device.get("SERIAL") for device in devices]
+
+        written = self.fleet.update(valid, [serial for serial in seen if serial not in invalid])
+        self.mark_parsed(written)
+        return self.fleet
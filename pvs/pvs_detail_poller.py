@@ -0,0 +1,90 @@
+"""Periodic polling of the PVS DeviceList"""
+
+import asyncio
+import contextlib
+import logging
+from typing import TYPE_CHECKING
+
+import httpx
+
+from pvs.pvs_detail import PVSDetail
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from pvs.pvs_fleet import PanelFleet
+
+logger = logging.getLogger(__name__)
+
+
+class PVSDetailPoller:
+    """Fetches the DeviceList every interval and hands the panel fleet to on_fleet on new readings
+
+    A fetch runs as its own task so a slow PVS never holds up the caller, and a tick that
+    comes around while the previous fetch is still running is skipped.
+    """
+
+    def __init__(self, detail: PVSDetail, interval: float = 300) -> None:
+        """Initialize the poller"""
+        self.detail = detail
+        self.interval = interval
+        self.on_fleet: Callable[[PanelFleet], None] | None = None
+        self.running = False
+        self.skipped = 0
+        self._fetch: asyncio.Task | None = None
+        self._stopped = asyncio.Event()
+
+    async def run(self) -> None:
+        """Start a fetch every interval until stopped"""
+        self.running = True
+        self._stopped.clear()
+
+        while self.running:
+            if self._fetch is None or self._fetch.done():
+                self._fetch = asyncio.create_task(self.poll())
+            else:
+                self.skipped += 1
+                msg = (
+                    f"PVS DeviceList fetch still running after {self.interval}s, "
+                    f"skipped {self.skipped} polls"
+                )
+                logger.warning(msg)
+
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._stopped.wait(), timeout=self.interval)
+
+    async def poll(self) -> None:
+        """Fetch the DeviceList once and pass the updated panel fleet on"""
+        try:
+            await self.detail.fetch_pvs_detail()
+            fleet = await asyncio.to_thread(self.detail.update_fleet)
+        except (httpx.HTTPError, ValueError) as e:
+            msg = f"Could not get the PVS DeviceList: {e}"
+            logger.warning(msg)
+            return
+
+        if not fleet.updated:
+            logger.debug("No new panel readings in the PVS DeviceList")
+            return
+
+        msg = (
+            f"Got new readings of {fleet.updated} of "
+            f"{fleet.stats.get('power', {}).get('count', 0)} solar panels from the PVS "
+            f"DeviceList, outliers: {fleet.outliers()}"
+        )
+        logger.debug(msg)
+
+        if self.on_fleet is not None:
+            self.on_fleet(fleet)
+
+    async def stop(self) -> None:
+        """Stop polling and cancel a running fetch"""
+        self.running = False
+        self._stopped.set()
+
+        if self._fetch is not None and not self._fetch.done():
+            self._fetch.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._fetch
+
+        await self.detail.aclose()
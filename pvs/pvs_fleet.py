@@ -0,0 +1,176 @@
+"""Columnar per-panel readings of the PVS DeviceList with fleet statistics"""
+
+import logging
+from array import array
+from collections.abc import Iterable
+from itertools import compress
+
+logger = logging.getLogger(__name__)
+
+# Columns kept per panel, and the DeviceList key and scale each is read from
+FLEET_COLUMNS = {
+    "power": ("p_mppt1_kw", 1000),
+    "voltage": ("v_mppt1_v", 1),
+    "current": ("i_mppt1_a", 1),
+    "energy": ("ltea_3phsum_kwh", 1),
+}
+
+# Percentiles reported for every column besides the median
+FLEET_PERCENTILES = (10, 90)
+
+# Panels producing this fraction below the fleet median power are flagged as outliers
+OUTLIER_THRESHOLD = 0.2
+
+# Below this fleet median power in W, at dawn, dusk or night, no panel is flagged
+OUTLIER_MIN_POWER = 20
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Linearly interpolated q-th percentile of sorted values"""
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class PanelFleet:
+    """Readings of every panel in one array per column, at a stable slot per serial
+
+    Each update overwrites the slots in place, so a poll allocates no per-panel objects. A
+    panel missing from a poll keeps its slot but is left out of the statistics until it is
+    seen again, and changed flags the slots written by the last update. The statistics are
+    plain loops, sorted and sum over the arrays, as numpy is not a dependency.
+    """
+
+    def __init__(
+        self,
+        outlier_threshold: float = OUTLIER_THRESHOLD,
+        min_power: float = OUTLIER_MIN_POWER,
+    ) -> None:
+        """Initialize an empty fleet"""
+        self.outlier_threshold = outlier_threshold
+        self.min_power = min_power
+        self.slots: dict[str, int] = {}
+        self.serials: list[str] = []
+        self.columns = {column: array("d") for column in FLEET_COLUMNS}
+        self.present = array("B")
+        self.changed = array("B")
+        self.updated = 0
+        self.deviation = array("d")
+        self.outlier = array("B")
+        self.stats: dict[str, dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        """Number of panels ever seen"""
+        return len(self.serials)
+
+    def update(self, devices: Iterable[dict], seen: Iterable[str] | None = None) -> list[dict]:
+        """Overwrite the slots of the given inverter entries and recompute the statistics
+
+        seen lists the serials of every panel in the poll when devices only holds those with
+        new readings, the others keep their values. The statistics are only recomputed when a
+        panel was written or the set of panels changed. Entries without a SERIAL or a reading,
+        like an inverter in an error state, are logged and skipped, and their panels are left
+        out of the statistics even when in seen. Returns the entries written.
+        """
+        previous = self.present
+        self.present = present = array("B", bytes(len(self.serials)))
+        self.changed = changed = array("B", bytes(len(self.serials)))
+
+        columns = [(self.columns[column], *source) for column, source in FLEET_COLUMNS.items()]
+        written = []
+        skipped = set()
+        for device in devices:
+            serial = device.get("SERIAL")
+            try:
+                readings = [float(device[key]) * scale for _values, key, scale in columns]
+            except (KeyError, TypeError, ValueError) as e:
+                msg = f"Skipping solar inverter {serial} in state {device.get('STATE')}: {e!r}"
+                logger.warning(msg)
+                skipped.add(serial)
+                continue
+
+            if serial is None:
+                logger.warning("Skipping a solar inverter without a SERIAL")
+                continue
+
+            slot = self.slots.get(serial)
+            if slot is None:
+                slot = self._add(serial)
+                present.append(0)
+                changed.append(0)
+
+            for (values, _key, _scale), reading in zip(columns, readings, strict=True):
+                values[slot] = reading
+            present[slot] = changed[slot] = 1
+            written.append(device)
+
+        for serial in seen or ():
+            slot = self.slots.get(serial)
+            if slot is not None and serial not in skipped:
+                present[slot] = 1
+
+        if written or present != previous:
+            self._compute()
+        self.updated = len(written)
+        return written
+
+    def _add(self, serial: str) -> int:
+        """Give a newly seen serial the next slot"""
+        slot = len(self.serials)
+        self.slots[serial] = slot
+        self.serials.append(serial)
+        for values in self.columns.values():
+            values.append(0.0)
+        self.deviation.append(0.0)
+        self.outlier.append(0)
+        return slot
+
+    def _compute(self) -> None:
+        """Compute the statistics of every column and the power deviation of every panel"""
+        everyone = all(self.present)
+        self.stats = {}
+        for column, values in self.columns.items():
+            seen = values if everyone else array("d", compress(values, self.present))
+            if not seen:
+                continue
+
+            ordered = sorted(seen)
+            total = sum(seen)
+            stats = {
+                "count": len(seen),
+                "total": total,
+                "mean": total / len(seen),
+                "median": percentile(ordered, 50),
+                "min": ordered[0],
+                "max": ordered[-1],
+            }
+            stats.update({f"p{q}": percentile(ordered, q) for q in FLEET_PERCENTILES})
+            self.stats[column] = stats
+
+        median = self.stats.get("power", {}).get("median", 0)
+        if median < self.min_power:
+            self.deviation = array("d", bytes(len(self.deviation) * self.deviation.itemsize))
+            self.outlier = array("B", bytes(len(self.outlier)))
+            return
+
+        threshold = -self.outlier_threshold
+        self.deviation = array("d", [(power - median) / median for power in self.columns["power"]])
+        self.outlier = array(
+            "B",
+            [
+                deviation < threshold and present
+                for deviation, present in zip(self.deviation, self.present, strict=True)
+            ],
+        )
+
+    def panel(self, slot: int) -> dict[str, float]:
+        """Readings, deviation and outlier flag of the panel in slot"""
+        values = {column: values[slot] for column, values in self.columns.items()}
+        values["deviation"] = self.deviation[slot]
+        values["outlier"] = self.outlier[slot]
+        return values
+
+    def outliers(self) -> list[str]:
+        """Serials of the panels flagged as outliers"""
+        return list(compress(self.serials, self.outlier))
@@ -2,10 +2,14 @@
 
 import asyncio
 import logging
+import time
 from typing import TYPE_CHECKING, Literal
 
 import websockets
 
+from stats import STATS
+from stats.trace import TRACER
+
 if TYPE_CHECKING:
     from collections.abc import Callable
 
@@ -90,7 +94,14 @@ class PVSWebSocket:
                 # Listen without timeout
                 message = await self.websocket.recv()
 
-            await self.handle_message(message)
+            with TRACER.span("ws.frame", size=len(message)):
+                if STATS.enabled:
+                    STATS.inc("ws.frames")
+                    started = time.perf_counter()
+                    await self.handle_message(message)
+                    STATS.since("ws.handle", started)
+                else:
+                    await self.handle_message(message)
 
         except TimeoutError:
             msg = f"No messages received for {self.idle_timeout} seconds"
@@ -5,10 +5,115 @@ import asyncio
 import logging
 import os
 
+from api import ApiServer
 from ess import ESS
 from mqtt import MqttClient
-from pvs import PVSWebSocket
-from recorder import Recorder
+from pvs import PVSDetail, PVSDetailPoller, PVSWebSocket
+from pvs.pvs_detail import CACHE_MAX_AGE, PARSE_LEAN, PARSE_MODES
+from pvs.pvs_fleet import OUTLIER_THRESHOLD
+from recorder import PUBLISH_FIELDS, PUBLISH_MODES, WS_MODE_WINDOW, WS_MODES, Recorder
+from recorder.codec import CODECS
+from stats.trace import TRACER
+from store import MetricStore
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Build the clients and run the recorder
+
+    The clients are created inside the running loop since the async Modbus client binds to it.
+    """
+    if args.trace_file:
+        TRACER.configure(
+            args.trace_file,
+            sample_rate=args.trace_sample_rate,
+            max_bytes=int(args.trace_max_mb * 1024 * 1024),
+        )
+
+    pvsws = PVSWebSocket(
+        host=args.pvs_host,
+        port=args.pvs_ws_port,
+        ws_secure="wss" if args.pvs_ws_secure else "ws",
+    )
+
+    detail = None
+    if args.pvs_detail_interval > 0 or args.api_port:
+        detail = PVSDetail(
+            args.pvs_host,
+            args.pvs_port,
+            parse_mode=args.pvs_detail_parse,
+            outlier_threshold=args.panel_outlier_threshold,
+            cache_path=args.pvs_detail_cache,
+            max_age=args.pvs_detail_max_age,
+        )
+
+    detail_poller = None
+    if args.pvs_detail_interval > 0:
+        detail_poller = PVSDetailPoller(detail, interval=args.pvs_detail_interval)
+
+    mqtt = MqttClient(
+        host=args.mqtt_host,
+        port=args.mqtt_port,
+        topic=args.mqtt_topic,
+        username=args.mqtt_user,
+        password=args.mqtt_password,
+        buffer_size=args.mqtt_buffer_size,
+        spill_dir=args.mqtt_spill_dir,
+        max_spill_bytes=int(args.mqtt_spill_max_mb * 1024 * 1024),
+        drain_rate=args.mqtt_drain_rate,
+    )
+
+    ess = ESS(
+        ess_ip=args.ess_host,
+        ess_port502=args.ess_port,
+        ess_port503=args.ess_port_503,
+        device_file=args.ess_device_file,
+        max_read_gap=args.ess_max_read_gap,
+        poll_interval=args.ess_poll_interval,
+        slow_interval=args.ess_slow_interval,
+        poll_deadline=args.ess_poll_deadline,
+        request_timeout=args.ess_request_timeout,
+        device_budget=args.ess_device_budget,
+        failure_threshold=args.ess_failure_threshold,
+        connections=args.ess_connections,
+        max_concurrency=args.ess_max_concurrency,
+    )
+
+    store = None
+    if args.store_path:
+        store = MetricStore(
+            args.store_path,
+            retention_days=args.store_retention_days,
+            max_bytes=int(args.store_max_mb * 1024 * 1024),
+        )
+
+    api = None
+    if args.api_port:
+        api = ApiServer(
+            args.api_host,
+            args.api_port,
+            store,
+            devices=ess.device_info(),
+            enums=ess.enums(),
+            device_list=detail,
+        )
+
+    recorder = Recorder(
+        pvsws,
+        mqtt,
+        ess,
+        publish_mode=args.mqtt_publish_mode,
+        change_only=args.mqtt_change_only,
+        max_silence=args.mqtt_max_silence,
+        ws_mode=args.pvs_ws_mode,
+        codec=args.pvs_ws_codec,
+        store=store,
+        api=api,
+        stats_interval=args.stats_interval,
+        detail_poller=detail_poller,
+    )
+
+    await recorder.run()
+
 
 if __name__ == "__main__":
     # Install required packages:
@@ -20,6 +125,38 @@ if __name__ == "__main__":
     parser.add_argument("--pvs-host", default=os.environ.get("PVS_HOST", "172.27.153.1"))
     parser.add_argument("--pvs-ws-port", default=os.environ.get("PVS_WS_PORT", "9002"))
     parser.add_argument("--pvs-ws-secure", action="store_true", default=False)
+    parser.add_argument(
+        "--pvs-ws-mode",
+        choices=WS_MODES,
+        default=os.environ.get("PVS_WS_MODE", WS_MODE_WINDOW),
+    )
+    parser.add_argument(
+        "--pvs-ws-codec",
+        choices=CODECS,
+        default=os.environ.get("PVS_WS_CODEC", None),
+    )
+    parser.add_argument("--pvs-port", default=os.environ.get("PVS_PORT", "80"))
+    parser.add_argument(
+        "--pvs-detail-interval",
+        type=float,
+        default=os.environ.get("PVS_DETAIL_INTERVAL", "0"),
+    )
+    parser.add_argument(
+        "--pvs-detail-parse",
+        choices=PARSE_MODES,
+        default=os.environ.get("PVS_DETAIL_PARSE", PARSE_LEAN),
+    )
+    parser.add_argument("--pvs-detail-cache", default=os.environ.get("PVS_DETAIL_CACHE", None))
+    parser.add_argument(
+        "--pvs-detail-max-age",
+        type=float,
+        default=os.environ.get("PVS_DETAIL_MAX_AGE", str(CACHE_MAX_AGE)),
+    )
+    parser.add_argument(
+        "--panel-outlier-threshold",
+        type=float,
+        default=os.environ.get("PANEL_OUTLIER_THRESHOLD", str(OUTLIER_THRESHOLD)),
+    )
     parser.add_argument("--ess-host", default=os.environ.get("ESS_HOST", "172.27.153.171"))
     parser.add_argument("--ess-port", default=os.environ.get("ESS_PORT", "502"))
     parser.add_argument("--ess-port-503", default=os.environ.get("ESS_PORT_503", "503"))
@@ -27,11 +164,116 @@ if __name__ == "__main__":
         "--ess-device-file",
         default=os.environ.get("ESS_DEVICE_FILE", "ess_devices.json"),
     )
+    parser.add_argument(
+        "--ess-max-read-gap",
+        type=int,
+        default=os.environ.get("ESS_MAX_READ_GAP", "16"),
+    )
+    parser.add_argument(
+        "--ess-poll-interval",
+        type=float,
+        default=os.environ.get("ESS_POLL_INTERVAL", "5"),
+    )
+    parser.add_argument(
+        "--ess-slow-interval",
+        type=float,
+        default=os.environ.get("ESS_SLOW_INTERVAL", "60"),
+    )
+    parser.add_argument(
+        "--ess-poll-deadline",
+        type=float,
+        default=os.environ.get("ESS_POLL_DEADLINE", None),
+    )
+    parser.add_argument(
+        "--ess-request-timeout",
+        type=float,
+        default=os.environ.get("ESS_REQUEST_TIMEOUT", "2"),
+    )
+    parser.add_argument(
+        "--ess-device-budget",
+        type=float,
+        default=os.environ.get("ESS_DEVICE_BUDGET", None),
+    )
+    parser.add_argument(
+        "--ess-failure-threshold",
+        type=int,
+        default=os.environ.get("ESS_FAILURE_THRESHOLD", "3"),
+    )
+    parser.add_argument(
+        "--ess-connections",
+        type=int,
+        default=os.environ.get("ESS_CONNECTIONS", "1"),
+    )
+    parser.add_argument(
+        "--ess-max-concurrency",
+        type=int,
+        default=os.environ.get("ESS_MAX_CONCURRENCY", None),
+    )
     parser.add_argument("-H", "--mqtt-host", default=os.environ.get("MQTT_HOST", None))
     parser.add_argument("-P", "--mqtt-port", type=int, default=os.environ.get("MQTT_PORT", "1883"))
     parser.add_argument("-t", "--mqtt-topic", default=os.environ.get("MQTT_TOPIC", "pvs"))
     parser.add_argument("-u", "--mqtt-user", default=os.environ.get("MQTT_USER", "frigate"))
     parser.add_argument("-p", "--mqtt-password", default=os.environ.get("MQTT_PASSWORD", "frigate"))
+    parser.add_argument(
+        "--mqtt-buffer-size",
+        type=int,
+        default=os.environ.get("MQTT_BUFFER_SIZE", "10000"),
+    )
+    parser.add_argument("--mqtt-spill-dir", default=os.environ.get("MQTT_SPILL_DIR", None))
+    parser.add_argument(
+        "--mqtt-spill-max-mb",
+        type=float,
+        default=os.environ.get("MQTT_SPILL_MAX_MB", "10"),
+    )
+    parser.add_argument(
+        "--mqtt-drain-rate",
+        type=int,
+        default=os.environ.get("MQTT_DRAIN_RATE", "50"),
+    )
+    parser.add_argument(
+        "--mqtt-publish-mode",
+        choices=PUBLISH_MODES,
+        default=os.environ.get("MQTT_PUBLISH_MODE", PUBLISH_FIELDS),
+    )
+    parser.add_argument(
+        "--mqtt-change-only",
+        action="store_true",
+        default=os.environ.get("MQTT_CHANGE_ONLY", "false").lower() == "true",
+    )
+    parser.add_argument(
+        "--mqtt-max-silence",
+        type=float,
+        default=os.environ.get("MQTT_MAX_SILENCE", "300"),
+    )
+    parser.add_argument("--store-path", default=os.environ.get("STORE_PATH", None))
+    parser.add_argument(
+        "--store-retention-days",
+        type=float,
+        default=os.environ.get("STORE_RETENTION_DAYS", "30"),
+    )
+    parser.add_argument(
+        "--store-max-mb",
+        type=float,
+        default=os.environ.get("STORE_MAX_MB", "512"),
+    )
+    parser.add_argument("--api-host", default=os.environ.get("API_HOST", "127.0.0.1"))
+    parser.add_argument("--api-port", type=int, default=os.environ.get("API_PORT", None))
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=os.environ.get("STATS_INTERVAL", "0"),
+    )
+    parser.add_argument("--trace-file", default=os.environ.get("TRACE_FILE", None))
+    parser.add_argument(
+        "--trace-sample-rate",
+        type=float,
+        default=os.environ.get("TRACE_SAMPLE_RATE", "1"),
+    )
+    parser.add_argument(
+        "--trace-max-mb",
+        type=float,
+        default=os.environ.get("TRACE_MAX_MB", "50"),
+    )
     parser.add_argument("-d", "--debug", action="store_true")
     args = parser.parse_args()
 
@@ -49,27 +291,4 @@ if __name__ == "__main__":
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    pvsws = PVSWebSocket(
-        host=args.pvs_host,
-        port=args.pvs_ws_port,
-        ws_secure="wss" if args.pvs_ws_secure else "ws",
-    )
-
-    mqtt = MqttClient(
-        host=args.mqtt_host,
-        port=args.mqtt_port,
-        topic=args.mqtt_topic,
-        username=args.mqtt_user,
-        password=args.mqtt_password,
-    )
-
-    ess = ESS(
-        ess_ip=args.ess_host,
-        ess_port502=args.ess_port,
-        ess_port503=args.ess_port_503,
-        device_file=args.ess_device_file,
-    )
-
-    recorder = Recorder(pvsws, mqtt, ess)
-
-    asyncio.run(recorder.run())
+    asyncio.run(main(args))
@@ -1,6 +1,7 @@
 """Test Modbus Client"""
 
 import argparse
+import asyncio
 import json
 
 from ess.devices.bms import Bms
@@ -8,13 +9,15 @@ from ess.devices.gateway import Gateway
 from ess.devices.gateway503 import Gateway503
 from ess.devices.inverter import Inverter
 from ess.devices.inverter503 import Inverter503
-from ess.modbus import ModbusClient
+from ess.modbus import AsyncModbusClient
 
 
-def main(host: str, port: int, port503: int) -> None:
+async def main(host: str, port: int, port503: int) -> None:
     """Main function"""
-    client502 = ModbusClient(host, port)
-    client503 = ModbusClient(host, port503)
+    client502 = AsyncModbusClient(host, port)
+    client503 = AsyncModbusClient(host, port503)
+    await client502.connect()
+    await client503.connect()
 
     gateway = Gateway(client502, 1)
     gateway_503 = Gateway503(client503, 1)
@@ -29,11 +32,15 @@ def main(host: str, port: int, port503: int) -> None:
     bms2 = Bms(client502, 231)
 
     try:
-        gateway_str = json.dumps(gateway.get_data() | gateway_503.get_data(), indent=4)
-        inverter1_str = json.dumps(inverter1.get_data() | inverter1_503.get_data(), indent=4)
-        inverter2_str = json.dumps(inverter2.get_data() | inverter2_503.get_data(), indent=4)
-        bms1_str = json.dumps(bms1.get_data(), indent=4)
-        bms2_str = json.dumps(bms2.get_data(), indent=4)
+        gateway_data = await gateway.get_data() | await gateway_503.get_data()
+        inverter1_data = await inverter1.get_data() | await inverter1_503.get_data()
+        inverter2_data = await inverter2.get_data() | await inverter2_503.get_data()
+
+        gateway_str = json.dumps(gateway_data, indent=4)
+        inverter1_str = json.dumps(inverter1_data, indent=4)
+        inverter2_str = json.dumps(inverter2_data, indent=4)
+        bms1_str = json.dumps(await bms1.get_data(), indent=4)
+        bms2_str = json.dumps(await bms2.get_data(), indent=4)
 
         output = (
             "Gateway:\n"
@@ -55,13 +62,13 @@ def main(host: str, port: int, port503: int) -> None:
         print(output)  # noqa: T201
 
         # Some useful commands
-        # inverter1_503.reboot()
+        # await inverter1_503.reboot()
 
-        # inverter1_503.set_max_charge_rate(20)
-        # inverter2_503.set_max_charge_rate(20)
+        # await inverter1_503.write("max_charge_rate", 20)
+        # await inverter2_503.write("max_charge_rate", 20)
 
-        # inverter1_503.set_max_sell_amps(0)
-        # inverter2_503.set_max_sell_amps(27)
+        # await inverter1_503.write("max_sell_amps", 0)
+        # await inverter2_503.write("max_sell_amps", 27)
 
     finally:
         client502.disconnect()
@@ -78,4 +85,4 @@ if __name__ == "__main__":
     parser.add_argument("-P", "--ess-port-503", default="503")
     args = parser.parse_args()
 
-    main(args.ess_host, args.ess_port, args.ess_port_503)
+    asyncio.run(main(args.ess_host, args.ess_port, args.ess_port_503))
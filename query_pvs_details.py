@@ -5,9 +5,12 @@ import argparse
 from pvs.pvs_detail import PVSDetail
 
 
-def main(host: str, port: int, output_file: str | None) -> None:
+def main(host: str, port: int, output_file: str | None, api: str | None) -> None:
     """Main function"""
     pvs_detail = PVSDetail(host, port)
+    if api:
+        # Read the DeviceList cached by a running recorder instead of querying the PVS
+        pvs_detail.url = f"http://{api}/devicelist"
     pvs_detail.get_pvs_detail()
     solar_inverters = pvs_detail.get_solar_inverters()
 
@@ -30,6 +33,7 @@ if __name__ == "__main__":
     parser.add_argument("-H", "--pvs-host", default="172.27.153.1")
     parser.add_argument("-p", "--pvs-port", default="80")
     parser.add_argument("-o", "--output-file", default=None)
+    parser.add_argument("-a", "--api", default=None, help="host:port of a recorder API")
     args = parser.parse_args()
 
-    main(args.pvs_host, args.pvs_port, args.output_file)
+    main(args.pvs_host, args.pvs_port, args.output_file, args.api)
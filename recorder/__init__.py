@@ -7,24 +7,81 @@ import signal
 import sys
 from datetime import datetime
 
+from api import ApiServer
 from ess import ESS
 from mqtt import MqttClient
-from pvs import PVSWebSocket
+from pvs import PVSDetailPoller, PVSWebSocket
+from pvs.pvs_fleet import PanelFleet
+from stats import StatsReporter, timed
+from stats.trace import TRACER
+from store import MetricStore
+
+from .aggregator import WindowAggregator
+from .change_filter import NO_DEADBAND, ChangeFilter, Deadband
+from .codec import FrameCodec, PowerSample
 
 logger = logging.getLogger(__name__)
 
-WS_PARAMS = [
+# Params of power notifications, in PowerSample order
+WS_PARAMS = list(PowerSample._fields)
+
+# Cumulative WS params, summarised by their last value rather than their mean over a window
+WS_CUMULATIVE = (
     "time",
-    "site_load_p",
-    "net_p",
-    "pv_p",
     "site_load_en",
     "net_en",
     "pv_en",
-    "ess_p",
     "ess_en",
-    "soc",
-]
+)
+
+# (absolute, relative) deadbands of WS params for change-only publishing, powers are in kW
+WS_DEADBANDS: dict[str, Deadband] = {
+    "site_load_p": (0.01, 0),
+    "net_p": (0.01, 0),
+    "pv_p": (0.01, 0),
+    "ess_p": (0.01, 0),
+}
+# Window _min and _max companions share the deadband of their param
+WS_DEADBANDS.update(
+    {
+        f"{param}{suffix}": deadband
+        for param, deadband in WS_DEADBANDS.items()
+        for suffix in ("_min", "_max")
+    },
+)
+
+# Deadbands of the readings of each solar panel from the DeviceList in W, V and A, and of its
+# fractional deviation from the fleet median power
+PANEL_DEADBANDS: dict[str, Deadband] = {
+    "power": (1, 0),
+    "voltage": (0.5, 0),
+    "current": (0.01, 0),
+    "deviation": (0.01, 0),
+}
+
+# Fleet statistics of each panel column share the deadband of the column, except the count
+FLEET_DEADBANDS: dict[str, dict[str, Deadband]] = {
+    column: dict.fromkeys(("total", "mean", "median", "min", "max", "p10", "p90"), deadband)
+    for column, deadband in PANEL_DEADBANDS.items()
+}
+
+# Either fold every power frame into per-window statistics or publish one sample per window
+WS_MODE_WINDOW = "window"
+WS_MODE_SAMPLE = "sample"
+WS_MODES = (WS_MODE_WINDOW, WS_MODE_SAMPLE)
+
+PUBLISH_FIELDS = "fields"
+PUBLISH_JSON = "json"
+PUBLISH_BOTH = "both"
+PUBLISH_MODES = (PUBLISH_FIELDS, PUBLISH_JSON, PUBLISH_BOTH)
+
+# Subtopic of the per-device JSON document, and the topic name used for the PVS power frame
+JSON_TOPIC = "json"
+WS_POWER_TOPIC = "power"
+
+# Panels are published under panel/<serial>, their statistics under fleet/<column>
+PANEL_TOPIC = "panel"
+FLEET_TOPIC = "fleet"
 
 
 class Recorder:
@@ -32,67 +89,283 @@ class Recorder:
 
     WS_RECORD_INTERVAL = 10
     WS_LOG_INTERVAL = 60
+    CHANGE_REPORT_INTERVAL = 300
+
+    def __init__(  # noqa: PLR0913
+        self,
+        pvsws: PVSWebSocket,
+        mqtt: MqttClient,
+        ess: ESS,
+        publish_mode: str = PUBLISH_FIELDS,
+        *,
+        change_only: bool = False,
+        max_silence: float = 300,
+        ws_mode: str = WS_MODE_WINDOW,
+        codec: str | None = None,
+        store: MetricStore | None = None,
+        api: ApiServer | None = None,
+        stats_interval: float = 0,
+        detail_poller: PVSDetailPoller | None = None,
+    ) -> None:
+        """Returns instance of Recorder
+
+        publish_mode selects per-field topics, one JSON document per device and cycle, or both.
+        With change_only, values within their deadband of the last published value are not
+        published again until max_silence seconds have passed. ws_mode selects whether power
+        frames are aggregated over each WS_RECORD_INTERVAL window or sampled once per interval.
+        codec names the JSON library used for WebSocket frames, the fastest installed by default.
+        Every recorded value is also written to store when one is given, and kept as the
+        latest snapshot and metrics of api. With a stats_interval, instrumentation of the
+        pipeline is enabled and summarised under the _stats subtopic every stats_interval seconds.
+        The solar panels polled by detail_poller are published per serial under panel/<serial>,
+        and their fleet statistics and outliers under fleet.
+        """
+        if publish_mode not in PUBLISH_MODES:
+            msg = f"Unknown publish mode {publish_mode}, expected one of {PUBLISH_MODES}"
+            raise ValueError(msg)
+
+        if ws_mode not in WS_MODES:
+            msg = f"Unknown WebSocket mode {ws_mode}, expected one of {WS_MODES}"
+            raise ValueError(msg)
 
-    def __init__(self, pvsws: PVSWebSocket, mqtt: MqttClient, ess: ESS) -> None:
-        """Returns instance of Recorder"""
         self.pvsws = pvsws
         self.mqtt = mqtt
         self.ess = ess
         self.loop = None
+        self.publish_fields = publish_mode != PUBLISH_JSON
+        self.publish_json = publish_mode != PUBLISH_FIELDS
+        self.change_filter = ChangeFilter(max_silence) if change_only else None
+        self.ess_deadbands = ess.deadbands() if change_only else {}
+        self.last_change_report = 0
+        self.codec = FrameCodec(codec)
+        self.store = store
+        self.api = api
+        self.stats = (
+            StatsReporter(self.mqtt.publish, stats_interval) if stats_interval > 0 else None
+        )
+        self.aggregator = (
+            WindowAggregator(self.WS_RECORD_INTERVAL, WS_PARAMS, WS_CUMULATIVE)
+            if ws_mode == WS_MODE_WINDOW
+            else None
+        )
+
+        self.detail_poller = detail_poller
 
         self.pvsws.on_message = self.publish_message
         self.ess.on_message = self.publish_ess_data
+        if self.detail_poller is not None:
+            self.detail_poller.on_fleet = self.publish_panels
 
         self.last_power = 0
         self.last_record = 0
 
+    @timed("recorder.publish_message")
     def publish_message(self, data: any) -> None:
         """Publishes a message to the mqtt broker"""
         current = datetime.now().timestamp()  # noqa: DTZ005
+        sample = None
 
         try:
-            # Parse JSON message
-            data = json.loads(data)
+            if self.codec.is_power(data):
+                # Frames between sampled records are dropped before paying for a parse
+                if self.aggregator is None and current - self.last_record < self.WS_RECORD_INTERVAL:
+                    return
+
+                sample = self.codec.decode_power(data)
+
+            if sample is None:
+                # Parse JSON message
+                parsed = self.codec.loads(data)
 
-        except json.JSONDecodeError as e:
+        except ValueError as e:
             msg = f"Invalid JSON received: {e}"
             logger.exception(msg)
             msg = f"Raw message: {data}"
             logger.info(msg)
             return
 
-        if data.get("notification") == "power":
-            if (current - self.last_record) < self.WS_RECORD_INTERVAL:
-                return
+        if sample is not None:
+            self.record_power(sample, current)
+            return
+
+        # Print formatted JSON to console
+        msg = json.dumps(parsed, indent=2, ensure_ascii=False)
+        logger.info(msg)
 
+    def record_power(self, sample: PowerSample, current: float) -> None:
+        """Aggregate or sample a power notification and publish it"""
+        if self.aggregator is not None:
+            values = self.aggregator.add(sample, current)
+            if values is None:
+                return
+            # Stamped with the end of the closed window, not the start of the current one,
+            # which may be much later after a gap in the frames
+            timestamp = self.aggregator.closed_end
+        else:
             self.last_record = current
+            values = {
+                param: value
+                for param, value in zip(WS_PARAMS, sample, strict=True)
+                if value is not None
+            }
+            timestamp = current
 
-            params = data.get("params")
-            log_msgs = []
+        if self.store is not None:
+            self.store.record(values, timestamp)
 
-            for param in WS_PARAMS:
-                if param in params:
-                    self.mqtt.publish(params.get(param, 0), param)
-                    log_msgs.append(f"{param}: {params.get(param, 0)}")
+        if self.api is not None:
+            self.api.update(WS_POWER_TOPIC, values, timestamp)
 
-            if (current - self.last_power) > self.WS_LOG_INTERVAL:
-                msg = ", ".join(log_msgs)
-                logger.info(msg)
-                self.last_power = current
-            return
+        self._publish_values(values, None, WS_POWER_TOPIC, WS_DEADBANDS)
 
-        # Print formatted JSON to console
-        msg = json.dumps(data, indent=2, ensure_ascii=False)
-        logger.info(msg)
+        if (current - self.last_power) > self.WS_LOG_INTERVAL:
+            msg = ", ".join(f"{param}: {value}" for param, value in values.items())
+            logger.info(msg)
+            self.last_power = current
 
+    @timed("recorder.publish_ess_data")
     def publish_ess_data(self, data: any) -> None:
         """Publish ESS data to the mqtt broker"""
+        current = datetime.now().timestamp()  # noqa: DTZ005
+
         for device, device_data in data.items():
-            for key, value in device_data.items():
-                topic = f"{device}/{key}"
-                self.mqtt.publish(value, topic)
-                msg = f"Published {topic} to MQTT: {value}"
-                logger.info(msg)
+            if self.store is not None:
+                self.store.record(device_data, current, prefix=device)
+
+            if self.api is not None:
+                self.api.update(device, device_data, current)
+
+            self._publish_values(
+                device_data,
+                device,
+                device,
+                self.ess_deadbands.get(device, {}),
+                log=True,
+            )
+
+        self._report_changes()
+
+    @timed("recorder.publish_panels")
+    def publish_panels(self, fleet: PanelFleet) -> None:
+        """Publish the solar panels with new readings in the last poll and the fleet stats
+
+        Panels without new readings only publish their deviation from the new fleet median.
+        """
+        current = datetime.now().timestamp()  # noqa: DTZ005
+
+        for slot, serial in enumerate(fleet.serials):
+            if fleet.changed[slot]:
+                values = fleet.panel(slot)
+            elif fleet.present[slot]:
+                values = {"deviation": fleet.deviation[slot], "outlier": fleet.outlier[slot]}
+            else:
+                continue
+
+            self._record_panel_values(values, f"{PANEL_TOPIC}/{serial}", current, PANEL_DEADBANDS)
+
+        for column, stats in fleet.stats.items():
+            self._record_panel_values(
+                stats,
+                f"{FLEET_TOPIC}/{column}",
+                current,
+                FLEET_DEADBANDS.get(column, {}),
+            )
+
+        self._record_panel_values(
+            {"panels": len(fleet), "outliers": sum(fleet.outlier)},
+            FLEET_TOPIC,
+            current,
+            {},
+        )
+
+        self._report_changes()
+
+    def _record_panel_values(
+        self,
+        values: dict[str, float],
+        source: str,
+        current: float,
+        deadbands: dict[str, Deadband],
+    ) -> None:
+        """Store, serve and publish values of a panel or the fleet under source"""
+        if self.store is not None:
+            self.store.record(values, current, prefix=source)
+
+        if self.api is not None:
+            self.api.update(source, values, current)
+
+        self._publish_values(values, source, source, deadbands)
+
+    def _publish_values(
+        self,
+        values: dict[str, any],
+        prefix: str | None,
+        json_prefix: str,
+        deadbands: dict[str, Deadband],
+        *,
+        log: bool = False,
+    ) -> None:
+        """Publish values per field under prefix and/or as one JSON document
+
+        In change-only mode only changed fields are published, and the document is published
+        when any field changed or its heartbeat is due.
+        """
+        changed = list(values)
+        json_topic = f"{json_prefix}/{JSON_TOPIC}"
+
+        if self.change_filter is not None:
+            changed = [
+                key
+                for key, value in values.items()
+                if self.change_filter.changed(
+                    key if prefix is None else f"{prefix}/{key}",
+                    value,
+                    deadbands.get(key, NO_DEADBAND),
+                )
+            ]
+
+        if self.publish_fields:
+            for key in changed:
+                topic = key if prefix is None else f"{prefix}/{key}"
+                self.mqtt.publish(values[key], topic)
+                if log:
+                    msg = f"Published {topic} to MQTT: {values[key]}"
+                    logger.info(msg)
+
+            if self.change_filter is not None:
+                self.change_filter.record(len(changed), len(values) - len(changed))
+
+        if self.publish_json:
+            publish = self.change_filter is None or self.change_filter.touch(
+                json_topic,
+                force=bool(changed),
+            )
+
+            if publish:
+                self.mqtt.publish(json.dumps(values, separators=(",", ":")), json_topic)
+                if log:
+                    msg = f"Published {json_topic} to MQTT with {len(values)} fields"
+                    logger.info(msg)
+
+            if self.change_filter is not None:
+                self.change_filter.record(int(publish), int(not publish))
+
+    def _report_changes(self) -> None:
+        """Log how many publishes change-only publishing has saved"""
+        if self.change_filter is None:
+            return
+
+        current = datetime.now().timestamp()  # noqa: DTZ005
+        if current - self.last_change_report < self.CHANGE_REPORT_INTERVAL:
+            return
+
+        self.last_change_report = current
+        stats = self.change_filter.as_dict()
+        msg = (
+            f"Change-only publishing: {stats['published']} published, "
+            f"{stats['suppressed']} suppressed ({stats['saved_ratio']:.0%} saved)"
+        )
+        logger.info(msg)
 
     async def run(self) -> None:
         """Run the recorder"""
@@ -111,17 +384,32 @@ class Recorder:
             )
             logger.info(msg)
 
-        await asyncio.gather(
-            self.mqtt.run(),
-            self.pvsws.run(),
-            self.ess.run(),
-        )
+        tasks = [self.mqtt.run(), self.pvsws.run(), self.ess.run()]
+        if self.store is not None:
+            tasks.append(self.store.run())
+        if self.api is not None:
+            tasks.append(self.api.run())
+        if self.stats is not None:
+            tasks.append(self.stats.run())
+        if self.detail_poller is not None:
+            tasks.append(self.detail_poller.run())
+
+        await asyncio.gather(*tasks)
 
     async def _cleanup(self) -> None:
         """Cleanup PVS and Mqtt and stop the main loop"""
         await self.pvsws.stop()
         await self.mqtt.stop()
         await self.ess.stop()
+        if self.store is not None:
+            await self.store.stop()
+        if self.api is not None:
+            await self.api.stop()
+        if self.stats is not None:
+            await self.stats.stop()
+        if self.detail_poller is not None:
+            await self.detail_poller.stop()
+        TRACER.close()
         await asyncio.sleep(5)
         self.loop.stop()
 
@@ -0,0 +1,110 @@
+"""Streaming window aggregation of PVS power frames"""
+
+import math
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+
+class RunningStats:
+    """Count, mean, min, max and last of a stream of values in constant memory"""
+
+    __slots__ = ("count", "last", "maximum", "minimum", "total")
+
+    def __init__(self) -> None:
+        """Initialize empty statistics"""
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every value"""
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.last = None
+
+    def add(self, value: Any) -> None:  # noqa: ANN401
+        """Fold a value into the statistics, non-numeric values only update last"""
+        self.last = value
+
+        if isinstance(value, int | float) and not isinstance(value, bool):
+            self.count += 1
+            self.total += value
+            self.minimum = min(self.minimum, value)
+            self.maximum = max(self.maximum, value)
+
+    @property
+    def mean(self) -> float | None:
+        """Mean of the numeric values"""
+        return self.total / self.count if self.count else None
+
+
+class WindowAggregator:
+    """Folds frames into fixed, wall-clock aligned windows
+
+    Every param is summarised as its mean with _min and _max companions, except cumulative
+    params which are summarised by their last value. A window is closed by the first frame
+    that arrives after its end.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        params: Iterable[str],
+        cumulative: Iterable[str] = (),
+    ) -> None:
+        """Initialize the aggregator"""
+        self.window = window
+        self.stats = {param: RunningStats() for param in params}
+        self.cumulative = frozenset(cumulative)
+        self.samples = 0
+        self.window_index: int | None = None
+        # End time of the window summarised by the last summary add returned
+        self.closed_end: float | None = None
+
+    def add(self, values: Sequence[Any], now: float) -> dict[str, Any] | None:
+        """Fold a frame in, returning the summary of the window it closed if any
+
+        values holds one value per param in order, None for params missing from the frame.
+        """
+        index = int(now // self.window)
+        summary = None
+
+        if index != self.window_index:
+            if self.samples:
+                summary = self.summary()
+                self.closed_end = (self.window_index + 1) * self.window
+                self.reset()
+            self.window_index = index
+
+        for stats, value in zip(self.stats.values(), values, strict=True):
+            if value is not None:
+                stats.add(value)
+
+        self.samples += 1
+        return summary
+
+    def summary(self) -> dict[str, Any]:
+        """Return the summary of the current window"""
+        summary = {}
+
+        for param, stats in self.stats.items():
+            if stats.last is None:
+                continue
+
+            if param in self.cumulative or not stats.count:
+                summary[param] = stats.last
+                continue
+
+            summary[param] = stats.mean
+            summary[f"{param}_min"] = stats.minimum
+            summary[f"{param}_max"] = stats.maximum
+
+        summary["samples"] = self.samples
+        return summary
+
+    def reset(self) -> None:
+        """Start a new window"""
+        for stats in self.stats.values():
+            stats.reset()
+
+        self.samples = 0
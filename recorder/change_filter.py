@@ -0,0 +1,85 @@
+"""Change-only publishing with per-metric deadbands"""
+
+import time
+from typing import Any
+
+# (absolute, relative) deadband of a metric
+Deadband = tuple[float, float]
+
+NO_DEADBAND: Deadband = (0, 0)
+
+
+class ChangeFilter:
+    """Last-published-value cache that suppresses values which have not changed
+
+    A numeric value is suppressed while it stays within max(absolute, relative * |last|) of
+    the last published value, other values while they are equal to it. Every topic is still
+    published at least once every max_silence seconds as a heartbeat.
+    """
+
+    def __init__(self, max_silence: float = 300) -> None:
+        """Initialize an empty cache"""
+        self.max_silence = max_silence
+        self.last: dict[str, tuple[Any, float]] = {}
+        self.published = 0
+        self.suppressed = 0
+
+    def record(self, published: int, suppressed: int) -> None:
+        """Count publishes that were sent and suppressed"""
+        self.published += published
+        self.suppressed += suppressed
+
+    def changed(
+        self,
+        topic: str,
+        value: Any,  # noqa: ANN401
+        deadband: Deadband = NO_DEADBAND,
+        now: float | None = None,
+    ) -> bool:
+        """Whether value should be published to topic, recording it as published if so"""
+        now = time.monotonic() if now is None else now
+        cached = self.last.get(topic)
+
+        if cached is not None and now - cached[1] < self.max_silence:
+            last = cached[0]
+
+            if _is_number(value) and _is_number(last):
+                absolute, relative = deadband
+                unchanged = abs(value - last) <= max(absolute, relative * abs(last))
+            else:
+                unchanged = value == last
+
+            if unchanged:
+                return False
+
+        self.last[topic] = (value, now)
+        return True
+
+    def touch(self, topic: str, *, force: bool = False, now: float | None = None) -> bool:
+        """Whether topic is forced or due a heartbeat, recording it as published if so"""
+        now = time.monotonic() if now is None else now
+        cached = self.last.get(topic)
+
+        if not force and cached is not None and now - cached[1] < self.max_silence:
+            return False
+
+        self.last[topic] = (None, now)
+        return True
+
+    def clear(self) -> None:
+        """Forget every published value so everything is published again"""
+        self.last.clear()
+
+    def as_dict(self) -> dict[str, int | float]:
+        """Return the publish counters recorded so far"""
+        total = self.published + self.suppressed
+        return {
+            "published": self.published,
+            "suppressed": self.suppressed,
+            "saved_ratio": self.suppressed / total if total else 0.0,
+        }
+
+
+def _is_number(value: Any) -> bool:  # noqa: ANN401
+    """Whether value is a number that deadbands apply to"""
+    return isinstance(value, int | float) and not isinstance(value, bool)
@@ -0,0 +1,120 @@
+"""Fast decoding of PVS WebSocket frames
+
+msgspec or orjson are used when installed, with the standard library json module as fallback.
+"""
+
+import json
+from typing import Any, NamedTuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class PowerSample(NamedTuple):
+    """The params of a power notification, None where the frame lacks one"""
+
+    time: int | None = None
+    site_load_p: float | None = None
+    net_p: float | None = None
+    pv_p: float | None = None
+    site_load_en: float | None = None
+    net_en: float | None = None
+    pv_en: float | None = None
+    ess_p: float | None = None
+    ess_en: float | None = None
+    soc: float | None = None
+
+
+# Every power notification contains this token, frames without it can skip the power path
+POWER_MARKER = '"power"'
+POWER_MARKER_BYTES = POWER_MARKER.encode()
+
+CODECS = ("msgspec", "orjson", "json")
+
+if msgspec is not None:
+    _PowerParams = msgspec.defstruct(
+        "_PowerParams",
+        [(name, int | float | None, None) for name in PowerSample._fields],
+    )
+    _PowerFrame = msgspec.defstruct(
+        "_PowerFrame",
+        [("notification", str | None, None), ("params", _PowerParams | None, None)],
+    )
+
+
+def available_codecs() -> tuple[str, ...]:
+    """Return the codecs that can be used, fastest first"""
+    installed = {"msgspec": msgspec is not None, "orjson": orjson is not None, "json": True}
+    return tuple(name for name in CODECS if installed[name])
+
+
+class FrameCodec:
+    """Decodes WebSocket frames with the fastest available JSON library"""
+
+    def __init__(self, codec: str | None = None) -> None:
+        """Initialize the codec, picking the fastest available one when codec is None"""
+        available = available_codecs()
+
+        if codec is None:
+            codec = available[0]
+        elif codec not in available:
+            msg = f"JSON codec {codec} is not available, expected one of {available}"
+            raise ValueError(msg)
+
+        self.name = codec
+        self._power_decoder = None
+
+        if codec == "msgspec":
+            self._loads = msgspec.json.decode
+            self._power_decoder = msgspec.json.Decoder(_PowerFrame)
+        elif codec == "orjson":
+            self._loads = orjson.loads
+        else:
+            self._loads = json.loads
+
+    @staticmethod
+    def is_power(frame: str | bytes) -> bool:
+        """Whether a frame may be a power notification, without parsing it"""
+        return (POWER_MARKER if isinstance(frame, str) else POWER_MARKER_BYTES) in frame
+
+    def loads(self, frame: str | bytes) -> Any:  # noqa: ANN401
+        """Parse a frame, raising ValueError if it is not valid JSON"""
+        try:
+            return self._loads(frame)
+        except ValueError:
+            raise
+        except Exception as e:
+            # msgspec errors do not derive from ValueError
+            raise ValueError(str(e)) from e
+
+    def decode_power(self, frame: str | bytes) -> PowerSample | None:
+        """Decode a power notification straight into a PowerSample, None for other frames"""
+        if self._power_decoder is not None:
+            try:
+                decoded = self._power_decoder.decode(frame)
+            except msgspec.ValidationError:
+                # Valid JSON in another shape, fall through to the generic path
+                pass
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from e
+            else:
+                if decoded.notification != "power" or decoded.params is None:
+                    return None
+                return PowerSample(*msgspec.structs.astuple(decoded.params))
+
+        data = self.loads(frame)
+        if not isinstance(data, dict) or data.get("notification") != "power":
+            return None
+
+        params = data.get("params")
+        if not isinstance(params, dict):
+            params = {}
+
+        return PowerSample(*map(params.get, PowerSample._fields))
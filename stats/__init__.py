@@ -0,0 +1,230 @@
+"""Counters and fixed-bucket histograms for the hot paths of the recorder
+
+Instrumentation is off until STATS.enabled is set. Hot paths check the flag before reading
+the clock, so a disabled instrument costs an attribute lookup.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets in milliseconds, slower samples land in +Inf
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Quantiles estimated from the buckets in each summary
+QUANTILES = (0.5, 0.9, 0.99)
+
+# MQTT subtree the summaries are published under, dots in instrument names become levels
+STATS_TOPIC = "_stats"
+
+
+class Counter:
+    """A monotonically increasing count"""
+
+    __slots__ = ("reported", "value")
+
+    def __init__(self) -> None:
+        """Initialize the counter at zero"""
+        self.value = 0
+        self.reported = 0
+
+    def inc(self, amount: int = 1) -> None:
+        """Increase the count"""
+        self.value += amount
+
+    def summary(self, elapsed: float) -> dict[str, float]:
+        """Return the total and the rate per second since the previous summary"""
+        rate = (self.value - self.reported) / elapsed if elapsed > 0 else 0.0
+        self.reported = self.value
+        return {"total": self.value, "rate": round(rate, 3)}
+
+
+class Histogram:
+    """Distribution of observations over fixed buckets, reset by every summary"""
+
+    __slots__ = ("bounds", "count", "counts", "maximum", "total")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        """Initialize empty buckets with the given upper bounds"""
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add an observation"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket holding it"""
+        rank = q * self.count
+        seen = 0
+
+        for bound, count in zip(self.bounds, self.counts, strict=False):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+
+        return self.maximum
+
+    def summary(self, _elapsed: float) -> dict[str, float]:
+        """Return count, mean, max and quantiles of the observations, then reset"""
+        summary: dict[str, float] = {"count": self.count}
+
+        if self.count:
+            summary["mean"] = round(self.total / self.count, 3)
+            summary["max"] = round(self.maximum, 3)
+            summary.update({f"p{round(q * 100)}": round(self.quantile(q), 3) for q in QUANTILES})
+
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        return summary
+
+
+class Stats:
+    """Registry of named counters, histograms and gauges"""
+
+    def __init__(self) -> None:
+        """Initialize an empty, disabled registry"""
+        self.enabled = False
+        self.counters: dict[str, Counter] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self.gauges: dict[str, Callable[[], float]] = {}
+        self.last_summary = time.monotonic()
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        """Increase a counter, creating it if needed"""
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = Counter()
+        counter.inc(amount)
+
+    def observe(self, name: str, value: float) -> None:
+        """Add an observation to a latency histogram, creating it if needed"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value)
+
+    def since(self, name: str, started: float) -> None:
+        """Observe the milliseconds elapsed since the perf_counter reading started"""
+        self.observe(name, (time.perf_counter() - started) * 1000)
+
+    def gauge(self, name: str, func: Callable[[], float]) -> None:
+        """Register a gauge read when summaries are taken"""
+        self.gauges[name] = func
+
+    def summaries(self) -> dict[str, dict[str, float]]:
+        """Return the summary of every instrument
+
+        Counter rates and histograms cover the time since the previous call.
+        """
+        now = time.monotonic()
+        elapsed, self.last_summary = now - self.last_summary, now
+
+        summaries = {
+            name: instrument.summary(elapsed)
+            for instruments in (self.counters, self.histograms)
+            for name, instrument in instruments.items()
+        }
+        summaries.update({name: {"value": func()} for name, func in self.gauges.items()})
+        return summaries
+
+
+STATS = Stats()
+
+
+def timed(name: str) -> Callable:
+    """Decorate a function or coroutine function to observe its duration in name"""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+                if not STATS.enabled:
+                    return await func(*args, **kwargs)
+
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    STATS.since(name, started)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            if not STATS.enabled:
+                return func(*args, **kwargs)
+
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STATS.since(name, started)
+
+        return wrapper
+
+    return decorator
+
+
+class StatsReporter:
+    """Measures event loop lag and publishes the summaries of STATS every interval"""
+
+    def __init__(
+        self,
+        publish: Callable[[str, str], None],
+        interval: float = 60,
+        lag_interval: float = 1,
+    ) -> None:
+        """Initialize the reporter, publish takes a payload and a topic like MqttClient.publish"""
+        self.publish = publish
+        self.interval = interval
+        self.lag_interval = lag_interval
+        self.running = False
+
+    async def run(self) -> None:
+        """Sample loop lag and publish summaries until stopped"""
+        self.running = True
+        STATS.enabled = True
+        next_report = time.monotonic() + self.interval
+
+        while self.running:
+            expected = time.monotonic() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            # How late the loop woke us up, i.e. how long other callbacks held it
+            STATS.observe("loop.lag", (time.monotonic() - expected) * 1000)
+
+            if time.monotonic() >= next_report:
+                next_report += self.interval
+                self.report()
+
+    def report(self) -> None:
+        """Publish the summary of every instrument under STATS_TOPIC"""
+        summaries = STATS.summaries()
+
+        for name, summary in summaries.items():
+            topic = f"{STATS_TOPIC}/{name.replace('.', '/')}"
+            self.publish(json.dumps(summary, separators=(",", ":")), topic)
+
+        msg = f"Published {len(summaries)} instrumentation summaries"
+        logger.debug(msg)
+
+    async def stop(self) -> None:
+        """Stop the reporter"""
+        self.running = False
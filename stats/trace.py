@@ -0,0 +1,212 @@
+"""Span tracing of the recorder pipeline into Chrome trace / Perfetto JSON files
+
+Tracing is off until TRACER.configure is called. A span opened outside any other span is a
+root, like a poll cycle or a WebSocket frame, and sample_rate decides whether it and every
+span nested in it are recorded. Spans are written in the JSON array format, whose closing
+bracket is optional, so a file can be opened while it is still being written.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import os
+import random
+import time
+import weakref
+from contextvars import ContextVar
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+logger = logging.getLogger(__name__)
+
+# Events buffered in memory before they are appended to the file
+FLUSH_EVENTS = 1000
+
+# Seconds after which buffered events are written even if fewer than FLUSH_EVENTS are queued
+FLUSH_INTERVAL = 5
+
+# Whether the root span of the current task is sampled, None outside any span
+_sampled: ContextVar[bool | None] = ContextVar("trace_sampled", default=None)
+
+
+class NullSpan:
+    """A span that records nothing"""
+
+    def __enter__(self) -> Self:
+        """Enter the span"""
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        """Exit the span"""
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """Times a block and records it as a complete event when it exits"""
+
+    __slots__ = ("args", "name", "sampled", "started", "token", "tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, args: dict[str, Any], *, sampled: bool) -> None:
+        """Initialize the span, a root span when sampled is decided by it"""
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.sampled = sampled
+        self.token = None
+        self.started = 0
+
+    def __enter__(self) -> Self:
+        """Start timing"""
+        if _sampled.get() is None:
+            self.token = _sampled.set(self.sampled)
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        _exc: BaseException | None,
+        _traceback: TracebackType | None,
+    ) -> None:
+        """Record the span"""
+        if self.sampled:
+            if exc_type is not None:
+                self.args["error"] = exc_type.__name__
+            self.tracer.record(self.name, self.started, time.perf_counter_ns(), self.args)
+
+        if self.token is not None:
+            _sampled.reset(self.token)
+            self.tracer.maybe_flush()
+
+
+class Tracer:
+    """Records spans into a rotating trace file"""
+
+    def __init__(self) -> None:
+        """Initialize a disabled tracer"""
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.path: Path | None = None
+        self.max_bytes = 0
+        self.backups = 0
+        self.pid = os.getpid()
+        self.events: list[str] = []
+        self.tracks: weakref.WeakKeyDictionary[asyncio.Task, int] = weakref.WeakKeyDictionary()
+        self.free_tracks: list[int] = []
+        self.track_count = 0
+        self.last_flush = time.monotonic()
+
+    def configure(
+        self,
+        path: str,
+        sample_rate: float = 1.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        backups: int = 3,
+    ) -> None:
+        """Start tracing to path, rotating it into up to backups older files at max_bytes"""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.enabled = True
+
+        msg = f"Tracing {sample_rate:.0%} of poll cycles and frames to {self.path}"
+        logger.info(msg)
+
+    def span(self, name: str, **args: Any) -> Span | NullSpan:  # noqa: ANN401
+        """Return a context manager recording a span named name with args"""
+        if not self.enabled:
+            return NULL_SPAN
+
+        sampled = _sampled.get()
+        if sampled is None:
+            return Span(self, name, args, sampled=random.random() < self.sample_rate)  # noqa: S311
+        if not sampled:
+            return NULL_SPAN
+        return Span(self, name, args, sampled=True)
+
+    def record(self, name: str, started: int, ended: int, args: dict[str, Any]) -> None:
+        """Queue a complete event, timestamps are perf_counter_ns readings"""
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": started // 1000,
+            "dur": (ended - started) // 1000,
+            "pid": self.pid,
+            "tid": self._track(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(json.dumps(event, separators=(",", ":"), default=str))
+
+    def maybe_flush(self) -> None:
+        """Write queued events once enough have been queued or enough time has passed"""
+        if len(self.events) >= FLUSH_EVENTS or time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        """Append queued events to the trace file, rotating it when it is full"""
+        self.last_flush = time.monotonic()
+        if not self.events or self.path is None:
+            return
+
+        events, self.events = self.events, []
+        try:
+            if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+                self._rotate()
+
+            with self.path.open("a") as f:
+                if f.tell() == 0:
+                    f.write("[\n")
+                f.write(",\n".join(events) + ",\n")
+        except OSError:
+            logger.exception("Could not write trace events")
+
+    def close(self) -> None:
+        """Write queued events and stop tracing"""
+        self.flush()
+        self.enabled = False
+
+    def _rotate(self) -> None:
+        """Shift the trace file into its numbered backups, dropping the oldest"""
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+
+        if self.backups:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def _track(self) -> int:
+        """Return a small track id for the current task so concurrent polls get their own row
+
+        Ids of finished tasks are reused, keeping the number of rows at the peak concurrency.
+        """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            return 0
+        if task is None:
+            return 0
+
+        track = self.tracks.get(task)
+        if track is None:
+            if self.free_tracks:
+                track = heapq.heappop(self.free_tracks)
+            else:
+                self.track_count += 1
+                track = self.track_count
+            self.tracks[task] = track
+            weakref.finalize(task, heapq.heappush, self.free_tracks, track)
+        return track
+
+
+TRACER = Tracer()
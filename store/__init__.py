@@ -0,0 +1,418 @@
+"""Embedded time-series store for recorded metrics"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from pathlib import Path
+from typing import Any
+
+from .chunks import encode_chunk, iter_chunk
+from .rollups import TIER_RETENTION_DAYS, Bucket, RollupEngine, select_tier
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    series INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL,
+    text TEXT,
+    PRIMARY KEY (series, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS chunks (
+    series INTEGER NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (series, start_ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS chunks_end_ts ON chunks (end_ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    tier INTEGER NOT NULL,
+    series INTEGER NOT NULL,
+    start_ts INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    last REAL NOT NULL,
+    delta REAL,
+    PRIMARY KEY (tier, series, start_ts)
+) WITHOUT ROWID;
+"""
+
+# Share of the stored time range deleted per step while the database is over its size cap
+PRUNE_FRACTION = 0.05
+
+# Numeric samples are compacted into one chunk per series and chunk_span once their span has
+# been closed for this long, so late samples still land in raw rows
+COMPACT_DELAY = 600
+
+# A pending sample: series name, timestamp in milliseconds, numeric value, text value
+Sample = tuple[str, int, float | None, str | None]
+
+# A rollup bucket: start in milliseconds, count, mean, min, max, last, counter delta
+Rollup = tuple[int, int, float, float, float, float, float | None]
+
+
+def encode_value(value: Any) -> tuple[float | None, str | None]:  # noqa: ANN401
+    """Split a value into its numeric and text columns"""
+    if value is None:
+        return None, None
+
+    if isinstance(value, bool | int | float):
+        return float(value), None
+
+    if isinstance(value, str):
+        return None, value
+
+    return None, json.dumps(value, separators=(",", ":"))
+
+
+class MetricStore:
+    """Append-only SQLite store of recorded metrics
+
+    Samples are buffered in memory and written in batches by a single writer thread, so the
+    event loop never waits on the disk. Numeric samples are compacted into compressed chunks
+    of chunk_span seconds per series and rolled up into the tiers of store.rollups as they
+    are written. Samples older than retention_days are deleted and the oldest samples are
+    pruned while the database is larger than max_bytes, rollups follow TIER_RETENTION_DAYS.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        path: str,
+        *,
+        flush_interval: float = 10,
+        batch_size: int = 5000,
+        max_pending: int = 100000,
+        retention_days: float = 30,
+        max_bytes: int = 512 * 1024 * 1024,
+        maintenance_interval: float = 3600,
+        chunk_span: float = 3600,
+    ) -> None:
+        """Initialize the store, the database is opened by run"""
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self.maintenance_interval = maintenance_interval
+        self.chunk_span = int(chunk_span * 1000)
+
+        self.pending: list[Sample] = []
+        self.series: dict[str, int] = {}
+        self.rollups = RollupEngine()
+        self.written = 0
+        self.dropped = 0
+        self.db: sqlite3.Connection | None = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store")
+        self.running = False
+        self.last_maintenance = 0.0
+        self._wake = asyncio.Event()
+
+    def record(self, values: dict[str, Any], timestamp: float, prefix: str | None = None) -> None:
+        """Queue values sampled at timestamp, named prefix/key or key"""
+        ts = int(timestamp * 1000)
+
+        for key, value in values.items():
+            name = key if prefix is None else f"{prefix}/{key}"
+            self.pending.append((name, ts, *encode_value(value)))
+
+        if len(self.pending) > self.max_pending:
+            excess = len(self.pending) - self.max_pending
+            del self.pending[:excess]
+            self.dropped += excess
+
+        if len(self.pending) >= self.batch_size:
+            self._wake.set()
+
+    async def execute(self, func: Any, *args: Any) -> Any:  # noqa: ANN401
+        """Run func on the writer thread, which owns the database connection"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def run(self) -> None:
+        """Write queued samples in batches until stopped"""
+        await self.execute(self._open)
+        self.running = True
+
+        while self.running:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            self._wake.clear()
+
+            await self.flush()
+
+            if time.monotonic() - self.last_maintenance >= self.maintenance_interval:
+                self.last_maintenance = time.monotonic()
+                await self.execute(self._maintain)
+
+        await self.flush()
+        await self.execute(self._close)
+
+    async def flush(self) -> None:
+        """Write every queued sample"""
+        batch, self.pending = self.pending, []
+
+        if batch:
+            await self.execute(self._write, batch)
+
+    async def stop(self) -> None:
+        """Stop the store, run flushes what is still queued and closes the database"""
+        self.running = False
+        self._wake.set()
+
+    def _open(self) -> None:
+        """Open the database and create the schema"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        # auto_vacuum only takes effect before the first table is created
+        self.db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+        self.series = dict(self.db.execute("SELECT name, id FROM series"))
+        self._load_rollups()
+
+        msg = f"Opened metric store {self.path} with {len(self.series)} series"
+        logger.info(msg)
+
+    def _close(self) -> None:
+        """Close the database"""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _series_id(self, name: str) -> int:
+        """Return the id of a series, creating it if needed"""
+        series_id = self.series.get(name)
+
+        if series_id is None:
+            self.db.execute("INSERT OR IGNORE INTO series (name) VALUES (?)", (name,))
+            series_id = self.series[name] = self.db.execute(
+                "SELECT id FROM series WHERE name = ?",
+                (name,),
+            ).fetchone()[0]
+
+        return series_id
+
+    def _write(self, batch: list[Sample]) -> None:
+        """Insert a batch of samples in one transaction"""
+        try:
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO samples (series, ts, value, text) VALUES (?, ?, ?, ?)",
+                    [(self._series_id(name), ts, value, text) for name, ts, value, text in batch],
+                )
+                self._write_rollups(batch)
+        except sqlite3.Error:
+            self.dropped += len(batch)
+            msg = f"Could not write {len(batch)} samples to the metric store"
+            logger.exception(msg)
+            return
+
+        self.written += len(batch)
+
+    def _load_rollups(self) -> None:
+        """Reopen the latest rollup bucket of every tier and series"""
+        names = {series_id: name for name, series_id in self.series.items()}
+        rows = self.db.execute(
+            "SELECT tier, series, start_ts, count, total, min, max, last, delta FROM rollups "
+            "WHERE (tier, series, start_ts) IN "
+            "(SELECT tier, series, MAX(start_ts) FROM rollups GROUP BY tier, series)",
+        )
+
+        for tier, series_id, *row in rows:
+            self.rollups.restore(tier, names[series_id], Bucket.from_row(row))
+
+    def _write_rollups(self, batch: list[Sample]) -> None:
+        """Fold the numeric samples of a batch into the rollups and save the changed buckets"""
+        for name, ts, value, _text in batch:
+            if value is not None:
+                self.rollups.add(name, ts, value)
+
+        self.db.executemany(
+            "INSERT OR REPLACE INTO rollups "
+            "(tier, series, start_ts, count, total, min, max, last, delta) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (tier, self.series[name], *bucket.as_row())
+                for tier, name, bucket in self.rollups.pop_dirty()
+            ],
+        )
+
+    def _size(self) -> int:
+        """Bytes used by the database, not counting free pages"""
+        page_size = self.db.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self.db.execute("PRAGMA page_count").fetchone()[0]
+        free_count = self.db.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_count) * page_size
+
+    def iter_points(
+        self,
+        name: str,
+        start: int,
+        end: int,
+    ) -> Iterator[tuple[int, float | None, str | None]]:
+        """Yield the (ts, value, text) samples of a series with start <= ts < end in order
+
+        Chunks are decoded point by point and merged with the raw rows. Like every database
+        access this must run on the writer thread, see execute.
+        """
+        series_id = self.series.get(name)
+        if series_id is None:
+            return
+
+        chunks = self.db.execute(
+            "SELECT data FROM chunks WHERE series = ? AND start_ts < ? AND end_ts >= ? "
+            "ORDER BY start_ts",
+            (series_id, end, start),
+        )
+        chunk_points = (
+            (ts, value, None)
+            for (data,) in chunks
+            for ts, value in iter_chunk(data)
+            if start <= ts < end
+        )
+        rows = self.db.execute(
+            "SELECT ts, value, text FROM samples WHERE series = ? AND ts >= ? AND ts < ? "
+            "ORDER BY ts",
+            (series_id, start, end),
+        )
+
+        yield from heapq.merge(chunk_points, rows, key=itemgetter(0))
+
+    def iter_rollups(self, name: str, tier: int, start: int, end: int) -> Iterator[Rollup]:
+        """Yield the rollup buckets of a series and tier with start <= start_ts < end in order
+
+        Like every database access this must run on the writer thread, see execute.
+        """
+        series_id = self.series.get(name)
+        if series_id is None:
+            return
+
+        yield from self.db.execute(
+            "SELECT start_ts, count, total / count, min, max, last, delta FROM rollups "
+            "WHERE tier = ? AND series = ? AND start_ts >= ? AND start_ts < ? ORDER BY start_ts",
+            (tier, series_id, start, end),
+        )
+
+    @staticmethod
+    def select_tier(start: int, end: int, max_points: int) -> int | None:
+        """Return the coarsest rollup tier giving at least max_points buckets over a range
+
+        None means the range is short enough to read raw samples.
+        """
+        return select_tier((end - start) / 1000 / max_points)
+
+    def _compact(self) -> int:
+        """Move numeric samples of closed chunk spans into chunks, return how many were moved"""
+        cutoff = (int((time.time() - COMPACT_DELAY) * 1000) // self.chunk_span) * self.chunk_span
+        rows = self.db.execute(
+            "SELECT series, ts, value FROM samples WHERE ts < ? AND value IS NOT NULL "
+            "ORDER BY series, ts",
+            (cutoff,),
+        )
+        compacted = 0
+
+        for (series_id, span), group in itertools.groupby(
+            rows,
+            key=lambda row: (row[0], row[1] // self.chunk_span),
+        ):
+            points = {ts: value for _series_id, ts, value in group}
+            start_ts = span * self.chunk_span
+            existing = self.db.execute(
+                "SELECT data FROM chunks WHERE series = ? AND start_ts = ?",
+                (series_id, start_ts),
+            ).fetchone()
+
+            if existing is not None:
+                # Samples that arrived after the span was compacted
+                points = dict(iter_chunk(existing[0])) | points
+
+            timestamps = sorted(points)
+            self.db.execute(
+                "INSERT OR REPLACE INTO chunks (series, start_ts, end_ts, count, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    series_id,
+                    start_ts,
+                    timestamps[-1],
+                    len(timestamps),
+                    encode_chunk(timestamps, [points[ts] for ts in timestamps]),
+                ),
+            )
+            compacted += len(timestamps)
+
+        self.db.execute("DELETE FROM samples WHERE ts < ? AND value IS NOT NULL", (cutoff,))
+        return compacted
+
+    def _time_range(self) -> tuple[int | None, int | None]:
+        """Return the first and last timestamp across raw samples and chunks"""
+        first, last = self.db.execute(
+            "SELECT MIN(first), MAX(last) FROM ("
+            "SELECT MIN(ts) AS first, MAX(ts) AS last FROM samples UNION ALL "
+            "SELECT MIN(start_ts), MAX(end_ts) FROM chunks)",
+        ).fetchone()
+        return first, last
+
+    def _delete_before(self, cutoff: int) -> int:
+        """Delete raw samples and whole chunks older than cutoff"""
+        deleted = self.db.execute("DELETE FROM samples WHERE ts < ?", (cutoff,)).rowcount
+        deleted += self.db.execute("DELETE FROM chunks WHERE end_ts < ?", (cutoff,)).rowcount
+        return deleted
+
+    def _maintain(self) -> None:
+        """Apply the retention policy and size cap"""
+        try:
+            with self.db:
+                compacted = self._compact()
+                cutoff = int((time.time() - self.retention_days * 86400) * 1000)
+                expired = self._delete_before(cutoff)
+
+                for tier, days in TIER_RETENTION_DAYS.items():
+                    if days is not None:
+                        cutoff = int((time.time() - days * 86400) * 1000)
+                        expired += self.db.execute(
+                            "DELETE FROM rollups WHERE tier = ? AND start_ts < ?",
+                            (tier, cutoff),
+                        ).rowcount
+
+                pruned = 0
+                fraction = PRUNE_FRACTION
+                while self._size() > self.max_bytes and fraction < 1:
+                    first, last = self._time_range()
+                    if first is None or first == last:
+                        break
+                    deleted = self._delete_before(first + max(1, int((last - first) * fraction)))
+                    # A chunk straddling the cutoff is only deleted as a whole, step further
+                    fraction = fraction if deleted else fraction * 2
+                    pruned += deleted
+
+            # executescript steps the vacuum to completion, execute only frees a single page
+            self.db.executescript("PRAGMA incremental_vacuum; PRAGMA wal_checkpoint(TRUNCATE);")
+        except sqlite3.Error:
+            logger.exception("Metric store maintenance failed")
+            return
+
+        msg = (
+            f"Metric store: {self.written} samples written, {self.dropped} dropped, "
+            f"{compacted} compacted, {expired} expired, {pruned} pruned, "
+            f"{self._size() / 1024 / 1024:.1f} MiB"
+        )
+        logger.info(msg)
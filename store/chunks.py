@@ -0,0 +1,215 @@
+"""Compressed chunk encoding of numeric series
+
+Timestamps are stored as delta-of-deltas and values either as the XOR of consecutive float64
+bit patterns, as in Facebook's Gorilla, or, for values that are exact multiples of a power of
+ten like scaled Modbus registers, as deltas of the underlying integers. Both use variable
+length bit buckets so regular series take a few bits per point.
+"""
+
+import struct
+from collections.abc import Iterator, Sequence
+
+CODEC_XOR = 0
+CODEC_SCALED = 1
+
+# Decimal places tried when looking for an integer representation of the values
+MAX_DECIMALS = 4
+
+HEADER = struct.Struct(">BBIqd")
+FLOAT = struct.Struct(">d")
+UINT64 = struct.Struct(">Q")
+
+# (prefix, prefix bits, value bits) of the delta buckets, the last bucket holds any int64
+BUCKETS = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12), (0b1111, 4, 64))
+BUCKET_BITS = tuple(bits for _prefix, _prefix_bits, bits in BUCKETS)
+
+# Largest integer a float64 holds exactly
+MAX_EXACT = 2**53
+
+
+class BitWriter:
+    """Appends bit fields to a byte buffer"""
+
+    def __init__(self) -> None:
+        """Initialize an empty buffer"""
+        self.out = bytearray()
+        self.acc = 0
+        self.bits = 0
+
+    def write(self, value: int, bits: int) -> None:
+        """Append the low bits of value"""
+        self.acc = (self.acc << bits) | (value & ((1 << bits) - 1))
+        self.bits += bits
+
+        while self.bits >= 8:  # noqa: PLR2004
+            self.bits -= 8
+            self.out.append((self.acc >> self.bits) & 0xFF)
+
+        self.acc &= (1 << self.bits) - 1
+
+    def getvalue(self) -> bytes:
+        """Return the buffer, padding the last byte with zeros"""
+        if self.bits:
+            return bytes(self.out) + bytes([(self.acc << (8 - self.bits)) & 0xFF])
+        return bytes(self.out)
+
+
+class BitReader:
+    """Reads bit fields from a byte buffer"""
+
+    def __init__(self, data: bytes, offset: int = 0) -> None:
+        """Start reading at byte offset"""
+        # Padding lets every read take a fixed nine byte window
+        self.data = bytes(data) + bytes(9)
+        self.pos = offset * 8
+
+    def read(self, bits: int) -> int:
+        """Read an unsigned field of up to 64 bits"""
+        start = self.pos >> 3
+        window = int.from_bytes(self.data[start : start + 9], "big")
+        shift = 72 - (self.pos & 7) - bits
+        self.pos += bits
+        return (window >> shift) & ((1 << bits) - 1)
+
+    def read_bit(self) -> int:
+        """Read a single bit"""
+        bit = (self.data[self.pos >> 3] >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return bit
+
+
+def _write_delta(writer: BitWriter, delta: int) -> None:
+    """Write a signed delta in the smallest bucket that holds it"""
+    if delta == 0:
+        writer.write(0, 1)
+        return
+
+    for prefix, prefix_bits, bits in BUCKETS:
+        if -(1 << (bits - 1)) <= delta < (1 << (bits - 1)) or bits == BUCKET_BITS[-1]:
+            writer.write(prefix, prefix_bits)
+            writer.write(delta, bits)
+            return
+
+
+def _read_delta(reader: BitReader) -> int:
+    """Read a delta written by _write_delta"""
+    if not reader.read_bit():
+        return 0
+
+    # Bucket prefixes are unary, a zero bit ends the prefix
+    bits = BUCKET_BITS[-1]
+    for bucket_bits in BUCKET_BITS[:-1]:
+        if not reader.read_bit():
+            bits = bucket_bits
+            break
+
+    value = reader.read(bits)
+    if value >= 1 << (bits - 1):
+        value -= 1 << bits
+    return value
+
+
+def _scale_of(values: Sequence[float]) -> int | None:
+    """Return the fewest decimals that represent every value exactly, None if there are none"""
+    for decimals in range(MAX_DECIMALS + 1):
+        scale = 10.0**-decimals
+        try:
+            if all(
+                abs(value) < MAX_EXACT * scale and round(value / scale) * scale == value
+                for value in values
+            ):
+                return decimals
+        except (OverflowError, ValueError):
+            # Infinite or NaN values only fit the XOR codec
+            return None
+
+    return None
+
+
+def encode_chunk(timestamps: Sequence[int], values: Sequence[float]) -> bytes:
+    """Encode a series of integer timestamps and float values
+
+    Each point after the first is written as its timestamp followed by its value, so points
+    can be decoded one at a time.
+    """
+    count = len(timestamps)
+    if count == 0 or count != len(values):
+        msg = "A chunk needs the same, non-zero number of timestamps and values"
+        raise ValueError(msg)
+
+    decimals = _scale_of(values)
+    codec = CODEC_XOR if decimals is None else CODEC_SCALED
+    scale = 10.0 ** -(decimals or 0)
+    writer = BitWriter()
+
+    previous_ts, previous_delta = timestamps[0], 0
+    previous_int = round(values[0] / scale) if codec == CODEC_SCALED else 0
+    previous_bits = UINT64.unpack(FLOAT.pack(values[0]))[0]
+    leading, trailing = 65, 0
+
+    for index in range(1, count):
+        ts = timestamps[index]
+        delta = ts - previous_ts
+        _write_delta(writer, delta - previous_delta)
+        previous_ts, previous_delta = ts, delta
+
+        if codec == CODEC_SCALED:
+            current = round(values[index] / scale)
+            _write_delta(writer, current - previous_int)
+            previous_int = current
+            continue
+
+        current = UINT64.unpack(FLOAT.pack(values[index]))[0]
+        xor = current ^ previous_bits
+        previous_bits = current
+
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+
+        current_leading = min(64 - xor.bit_length(), 31)
+        current_trailing = (xor & -xor).bit_length() - 1
+
+        if current_leading >= leading and current_trailing >= trailing:
+            # Fits the meaningful bits window of the previous value
+            writer.write(0b10, 2)
+            writer.write(xor >> trailing, 64 - leading - trailing)
+        else:
+            leading, trailing = current_leading, current_trailing
+            meaningful = 64 - leading - trailing
+            writer.write(0b11, 2)
+            writer.write(leading, 5)
+            writer.write(meaningful & 0x3F, 6)
+            writer.write(xor >> trailing, meaningful)
+
+    return HEADER.pack(codec, decimals or 0, count, timestamps[0], values[0]) + writer.getvalue()
+
+
+def iter_chunk(data: bytes) -> Iterator[tuple[int, float]]:
+    """Yield the (timestamp, value) points of a chunk one at a time"""
+    codec, decimals, count, ts, value = HEADER.unpack_from(data)
+    reader = BitReader(data, HEADER.size)
+    yield ts, value
+
+    scale = 10.0**-decimals
+    delta = 0
+    current = round(value / scale) if codec == CODEC_SCALED else 0
+    bits = UINT64.unpack(FLOAT.pack(value))[0]
+    leading = trailing = 0
+
+    for _ in range(count - 1):
+        delta += _read_delta(reader)
+        ts += delta
+
+        if codec == CODEC_SCALED:
+            current += _read_delta(reader)
+            yield ts, current * scale
+            continue
+
+        if reader.read_bit():
+            if reader.read_bit():
+                leading = reader.read(5)
+                meaningful = reader.read(6) or 64
+                trailing = 64 - leading - meaningful
+            bits ^= reader.read(64 - leading - trailing) << trailing
+        yield ts, FLOAT.unpack(UINT64.pack(bits))[0]
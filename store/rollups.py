@@ -0,0 +1,166 @@
+"""Incremental rollups of numeric series at several resolutions"""
+
+import math
+import re
+
+# Rollup resolutions in seconds, finest first
+TIERS = (60, 900, 3600, 86400)
+
+# Days each tier is kept, None keeps it forever
+TIER_RETENTION_DAYS = {60: 7, 900: 90, 3600: 730, 86400: None}
+
+# Energy counters, whose buckets also track how much they increased, including panel energy
+COUNTER = re.compile(r"_en$|_energy(_|$)|^energy$")
+
+# A counter dropping by more than this share of its value is taken to have been reset
+RESET_FRACTION = 0.9
+
+
+class Bucket:
+    """Count, total, min, max, last and counter delta of the samples in one time bucket"""
+
+    __slots__ = ("count", "delta", "last", "maximum", "minimum", "start", "total")
+
+    def __init__(self, start: int) -> None:
+        """Initialize an empty bucket starting at start"""
+        self.start = start
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.last = math.nan
+        self.delta = None
+
+    def add(self, value: float, increment: float | None) -> None:
+        """Fold a sample and, for counters, its increase since the previous sample in"""
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.last = value
+
+        if increment is not None:
+            self.delta = (self.delta or 0.0) + increment
+
+    def as_row(self) -> tuple[int, int, float, float, float, float, float | None]:
+        """Return start, count, total, min, max, last and delta"""
+        return (
+            self.start,
+            self.count,
+            self.total,
+            self.minimum,
+            self.maximum,
+            self.last,
+            self.delta,
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "Bucket":
+        """Restore a bucket from as_row"""
+        bucket = cls(row[0])
+        (
+            bucket.count,
+            bucket.total,
+            bucket.minimum,
+            bucket.maximum,
+            bucket.last,
+            bucket.delta,
+        ) = row[1:]
+        return bucket
+
+
+class RollupEngine:
+    """Maintains the open bucket of every tier and series as samples arrive
+
+    Samples must arrive in time order per series, samples older than the open bucket of a
+    tier are counted as late and left out of that tier. Buckets touched since the last
+    pop_dirty are returned by it so they can be persisted. A counter reset is only taken once
+    a second low sample confirms it, the first one is left out, and a drop to 0 is never taken
+    as a reset since that is what a failed read looks like.
+    """
+
+    def __init__(self, tiers: tuple[int, ...] = TIERS) -> None:
+        """Initialize the engine without any open buckets"""
+        self.tiers = tuple((tier, tier * 1000) for tier in tiers)
+        self.open: dict[tuple[int, str], Bucket] = {}
+        self.previous: dict[str, float] = {}
+        # Counters with an unconfirmed reset, and the sample that dropped
+        self.resets: dict[str, float] = {}
+        self.dirty: dict[tuple[int, str, int], Bucket] = {}
+        self.counters: dict[str, bool] = {}
+        self.late = 0
+
+    def is_counter(self, name: str) -> bool:
+        """Whether a series is an energy counter"""
+        counter = self.counters.get(name)
+
+        if counter is None:
+            counter = self.counters[name] = COUNTER.search(name.rsplit("/", 1)[-1]) is not None
+
+        return counter
+
+    def _increment(self, name: str, value: float) -> tuple[bool, float | None]:
+        """Return whether to keep a counter sample and its increase since the previous one"""
+        previous = self.previous.get(name)
+        pending = self.resets.pop(name, None)
+
+        if previous is not None:
+            increment = value - previous
+            if increment >= 0 or -increment <= RESET_FRACTION * abs(previous):
+                self.previous[name] = value
+                return True, increment
+
+            if value == 0 or pending is None:
+                # A failed read or a glitch unless the next sample is just as low
+                if value != 0:
+                    self.resets[name] = value
+                return False, None
+
+            # The counter restarted from zero
+            self.previous[name] = value
+            return True, value
+
+        self.previous[name] = value
+        return True, None
+
+    def add(self, name: str, ts: int, value: float) -> None:
+        """Fold a sample taken at ts milliseconds into every tier"""
+        increment = None
+
+        if self.is_counter(name):
+            keep, increment = self._increment(name, value)
+            if not keep:
+                return
+
+        for tier, span in self.tiers:
+            start = ts - ts % span
+            key = (tier, name)
+            bucket = self.open.get(key)
+
+            if bucket is None or bucket.start < start:
+                bucket = self.open[key] = Bucket(start)
+            elif bucket.start > start:
+                self.late += 1
+                continue
+
+            bucket.add(value, increment)
+            self.dirty[(tier, name, start)] = bucket
+
+    def restore(self, tier: int, name: str, bucket: Bucket) -> None:
+        """Reopen a persisted bucket, e.g. after a restart"""
+        self.open[(tier, name)] = bucket
+
+        if tier == self.tiers[0][0] and self.is_counter(name):
+            self.previous[name] = bucket.last
+
+    def pop_dirty(self) -> list[tuple[int, str, Bucket]]:
+        """Return and forget the buckets changed since the last call"""
+        dirty = [(tier, name, bucket) for (tier, name, _start), bucket in self.dirty.items()]
+        self.dirty.clear()
+        return dirty
+
+
+def select_tier(step: float, tiers: tuple[int, ...] = TIERS) -> int | None:
+    """Return the coarsest tier no coarser than step seconds, None if raw samples are needed"""
+    eligible = [tier for tier in tiers if tier <= step]
+    return max(eligible) if eligible else None